@@ -12,9 +12,10 @@ class SuggestedSearchQueries(BaseModel):
 class AgentA:
     """Agent responsible for generating search queries based on product and context"""
     
-    def __init__(self, basic_llm, company_context: StringKnowledgeSource):
+    def __init__(self, basic_llm, company_context: StringKnowledgeSource, verbose: bool = False):
         self.basic_llm = basic_llm
         self.company_context = company_context
+        self.verbose = verbose
         
     def create_agent(self):
         return Agent(
@@ -25,7 +26,7 @@ class AgentA:
             ]),
             backstory="The agent is designed to help in looking for products by providing a list of suggested search queries to be passed to the search engine based on the context provided.",
             llm=self.basic_llm,
-            verbose=True,
+            verbose=self.verbose,
         )
     
     def create_task(self, product_name: str, websites_list: List[str], country_name: str, 
@@ -3,6 +3,16 @@ from crewai.tools import tool
 from pydantic import BaseModel, Field
 from typing import List
 from tavily import TavilyClient
+import logging
+import time
+
+from helpers.deadline import check_deadline, current_deadline, DEADLINE_MESSAGE
+from helpers.job_context import current_job
+from helpers.logging_config import PayloadLogger
+from helpers.query_planner import COVERAGE_MESSAGE, split_site
+
+logger = logging.getLogger(__name__)
+payload_logger = PayloadLogger(logger)
 
 class SingleSearchResult(BaseModel):
     title: str
@@ -17,14 +27,46 @@ class AllSearchResults(BaseModel):
 class AgentB:
     """Agent responsible for performing web searches using Tavily"""
     
-    def __init__(self, basic_llm, search_client: TavilyClient):
+    def __init__(self, basic_llm, search_client: TavilyClient, verbose: bool = False):
         self.basic_llm = basic_llm
         self.search_client = search_client
+        self.verbose = verbose
         
     @tool
     def search_engine_tool(self, query: str) -> dict:
         """Useful for search-based queries. Use this to find current information about any query related pages using a search engine"""
-        return self.search_client.search(query)
+        check_deadline()
+        deadline = current_deadline()
+        if deadline and deadline.should_stop("search"):
+            return {"query": query, "results": [], "message": DEADLINE_MESSAGE}
+        job = current_job()
+        if job and job.search_coverage and job.search_coverage.should_stop():
+            return {"query": query, "results": [], "message": COVERAGE_MESSAGE}
+        
+        # Planned queries restrict themselves to one store with a site: operator
+        search_query, domain = split_site(query)
+        started = time.perf_counter()
+        if domain:
+            results = self.search_client.search(search_query, include_domains=[domain])
+        else:
+            results = self.search_client.search(search_query)
+        elapsed = time.perf_counter() - started
+        if deadline:
+            deadline.record_call("search", elapsed)
+        
+        logger.info("Search finished", extra={
+            "query": query,
+            "results": len(results.get("results") or []) if isinstance(results, dict) else None,
+            "seconds": round(elapsed, 3)
+        })
+        payload_logger.log("Search results", results, query=query)
+        
+        # Every raw result is a candidate for the local reranker
+        if job:
+            job.add_search_results(query, results)
+            if job.search_coverage:
+                job.search_coverage.observe(results)
+        return results
     
     def create_agent(self):
         return Agent(
@@ -32,21 +74,34 @@ class AgentB:
             goal="To search for products based on the suggested search query",
             backstory="The agent is designed to help in looking for products by searching for products based on the suggested search queries.",
             llm=self.basic_llm,
-            verbose=True,
+            verbose=self.verbose,
             tools=[self.search_engine_tool]
         )
     
-    def create_task(self, product_name: str, websites_list: List[str], country_name: str):
+    def create_task(self, product_name: str, websites_list: List[str], country_name: str, collect_only: bool = False):
+        """Search task; with collect_only the agent just runs the searches and the tool results are ranked locally"""
+        description = [
+            f"RankX is looking to buy {product_name} at the best prices (value for a price strategy).",
+            f"The company target any of these websites to buy from: {websites_list}.",
+            f"The company wants to reach all available products on the internet to be compared later in another stage.",
+            f"The stores must sell the product in {country_name}.",
+            "Search each suggested query exactly as written, including any site: part.",
+        ]
+        if collect_only:
+            return Task(
+                description="\n".join(description + [
+                    "Every search result is collected automatically; do not select, rank or repeat them.",
+                ]),
+                expected_output="The word DONE once every suggested query has been searched.",
+                agent=self.create_agent()
+            )
+        
         return Task(
-            description="\n".join([
-                f"RankX is looking to buy {product_name} at the best prices (value for a price strategy).",
-                f"The company target any of these websites to buy from: {websites_list}.",
-                f"The company wants to reach all available products on the internet to be compared later in another stage.",
-                f"The stores must sell the product in {country_name}.",
+            description="\n".join(description + [
                 "Collect the best search results from the search results.",
             ]),
             expected_output="A JSON object containing a list of search results.",
             output_json=AllSearchResults,
             output_file="step_2_search_results.json",
             agent=self.create_agent()
-        )
\ No newline at end of file
+        )
@@ -3,6 +3,16 @@ from crewai.tools import tool
 from pydantic import BaseModel, Field
 from typing import List
 from scrapegraphai import Client
+import json
+import logging
+import time
+
+from helpers.deadline import check_deadline, current_deadline, DEADLINE_MESSAGE
+from helpers.job_context import current_job
+from helpers.logging_config import PayloadLogger
+
+logger = logging.getLogger(__name__)
+payload_logger = PayloadLogger(logger)
 
 class ProductSpec(BaseModel):
     specification_name: str
@@ -28,9 +38,10 @@ class AllExtractedProducts(BaseModel):
 class AgentC:
     """Agent responsible for scraping product details from web pages"""
     
-    def __init__(self, basic_llm, scrape_client: Client):
+    def __init__(self, basic_llm, scrape_client: Client, verbose: bool = False):
         self.basic_llm = basic_llm
         self.scrape_client = scrape_client
+        self.verbose = verbose
         
     @tool
     def web_scraping_tool(self, page_url: str, required_fields: list) -> dict:
@@ -42,15 +53,33 @@ class AgentC:
             page_url="https://www.noon.com/egypt-en/15-bar-fully-automatic-espresso-machine-1-8-l-1500"
         )
         """
+        check_deadline()
+        deadline = current_deadline()
+        if deadline and deadline.should_stop("scrape"):
+            return {"page_url": page_url, "details": None, "message": DEADLINE_MESSAGE}
+        
+        started = time.perf_counter()
         details = self.scrape_client.smartscraper(
             website_url=page_url,
             user_prompt="Extract " + json.dumps(required_fields, ensure_ascii=False) + " from the web page."
         )
         
-        return {
+        elapsed = time.perf_counter() - started
+        logger.info("Scrape finished", extra={"page_url": page_url, "seconds": round(elapsed, 3)})
+        payload_logger.log("Scraped page details", details, page_url=page_url)
+        
+        page = {
             "page_url": page_url,
             "details": details
         }
+        if deadline:
+            deadline.record_call("scrape", elapsed)
+            deadline.record_partial(page)
+        # Each page is streamed as soon as it is scraped; products only exist once the task finishes
+        job = current_job()
+        if job:
+            job.stream("scraped_pages", page)
+        return page
     
     def create_agent(self):
         return Agent(
@@ -59,7 +88,7 @@ class AgentC:
             backstory="The agent is designed to help in looking for required values from any website url. These details will be used to decide which best product to buy.",
             llm=self.basic_llm,
             tools=[self.web_scraping_tool],
-            verbose=True,
+            verbose=self.verbose,
         )
     
     def create_task(self, top_recommendations_no: int):
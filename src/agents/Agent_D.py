@@ -4,9 +4,10 @@ from crewai.knowledge.source.string_knowledge_source import StringKnowledgeSourc
 class AgentD:
     """Agent responsible for generating the final procurement report"""
     
-    def __init__(self, basic_llm, company_context: StringKnowledgeSource):
+    def __init__(self, basic_llm, company_context: StringKnowledgeSource, verbose: bool = False):
         self.basic_llm = basic_llm
         self.company_context = company_context
+        self.verbose = verbose
         
     def create_agent(self):
         return Agent(
@@ -14,7 +15,7 @@ class AgentD:
             goal="To generate a professional HTML page for the procurement report",
             backstory="The agent is designed to assist in generating a professional HTML page for the procurement report after looking into a list of products.",
             llm=self.basic_llm,
-            verbose=True,
+            verbose=self.verbose,
         )
     
     def create_task(self):
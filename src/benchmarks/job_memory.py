@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for completed job results.
+
+Simulates N completed jobs and compares keeping full results in `job_store` (the old
+behaviour) against the on-disk JobResultStore with its LRU and a JobStore capped at
+`--max-finished` summaries. Each mode runs in its own process so one mode's heap does not
+inflate the other's RSS. Usage (from the src directory):
+
+    python -m benchmarks.job_memory --jobs 10000 --payload-bytes 200000
+"""
+
+import argparse
+import gc
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.job_results import JobResultStore, JobStore
+from benchmarks.load_test import current_rss_bytes
+
+def fake_results(output_dir: str, payload_bytes: int) -> Dict[str, Any]:
+    """Results shaped like execute_crew output with four task outputs and an HTML report"""
+    chunk = payload_bytes // 5
+    tasks_output = [
+        {"description": f"task {i}", "raw": uuid.uuid4().hex * (chunk // 32)}
+        for i in range(4)
+    ]
+    return {
+        "success": True,
+        "results": {
+            "raw": "<html>" + uuid.uuid4().hex * (chunk // 32) + "</html>",
+            "tasks_output": tasks_output
+        },
+        "output_directory": output_dir,
+        "llm_escalations": {"query": 0, "search": 0, "scrape": 0, "report": 0}
+    }
+
+def run(mode: str, jobs: int, payload_bytes: int, cache_bytes: int, read_ratio: float,
+        samples: int, max_finished: int) -> List[Dict[str, Any]]:
+    job_store: Dict[str, Dict[str, Any]] = {} if mode == "inline" else JobStore(max_finished)
+    timeline = []
+
+    with tempfile.TemporaryDirectory(prefix="rankx_job_memory_") as tmp:
+        store = JobResultStore(tmp, cache_bytes)
+        checkpoint = max(1, jobs // samples)
+        started = time.perf_counter()
+
+        for i in range(1, jobs + 1):
+            job_id = str(uuid.uuid4())
+            results = fake_results(os.path.join(tmp, job_id), payload_bytes)
+            if mode == "inline":
+                job_store[job_id] = {"job_id": job_id, "status": "completed", "results": results}
+            else:
+                job_store[job_id] = {"job_id": job_id, "status": "completed",
+                                     "results": store.save(job_id, results)}
+            del results
+
+            # Viewers mostly open recent jobs
+            if mode == "store" and random.random() < read_ratio:
+                recent = list(job_store)[-50:] if i % 100 == 0 else [job_id]
+                hot_id = random.choice(recent)
+                store.load(hot_id, job_store[hot_id]["results"])
+
+            if i % checkpoint == 0:
+                gc.collect()
+                timeline.append({
+                    "jobs": i,
+                    "rss_mb": (current_rss_bytes() or 0) / 1e6,
+                    "cached_mb": store.cached_bytes / 1e6,
+                    "summaries": len(job_store),
+                    "seconds": time.perf_counter() - started
+                })
+
+    return timeline
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memory use of completed job results")
+    parser.add_argument("--jobs", type=int, default=10000, help="Number of completed jobs to simulate")
+    parser.add_argument("--payload-bytes", type=int, default=200000, help="Approximate size of each job's results")
+    parser.add_argument("--cache-mb", type=float, default=64, help="LRU byte budget in MB")
+    parser.add_argument("--read-ratio", type=float, default=0.3, help="Chance each job is viewed after completion")
+    parser.add_argument("--samples", type=int, default=10, help="Number of RSS checkpoints")
+    parser.add_argument("--max-finished", type=int, default=1000, help="Finished job summaries kept in store mode")
+    parser.add_argument("--mode", choices=["store", "inline", "both"], default="both")
+    args = parser.parse_args()
+
+    if args.mode == "both":
+        print("🤖 RankX job result memory benchmark")
+        print("=" * 50)
+        # A fresh interpreter per mode, so the inline heap does not skew the store numbers
+        options = [
+            f"--{name.replace('_', '-')}={value}" for name, value in vars(args).items() if name != "mode"
+        ]
+        for mode in ("inline", "store"):
+            subprocess.run([sys.executable, "-m", "benchmarks.job_memory", *options, f"--mode={mode}"], check=True,
+                           cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        return
+
+    mode = args.mode
+    timeline = run(mode, args.jobs, args.payload_bytes, int(args.cache_mb * 1e6), args.read_ratio, args.samples,
+                   args.max_finished)
+    print(f"\n💾 Mode: {mode}")
+    print(f"{'jobs':>8}{'rss MB':>10}{'lru MB':>10}{'kept':>8}{'secs':>8}")
+    for sample in timeline:
+        print(f"{sample['jobs']:>8}{sample['rss_mb']:>10.1f}{sample['cached_mb']:>10.1f}"
+              f"{sample['summaries']:>8}{sample['seconds']:>8.1f}")
+
+    # Growth after warm-up shows whether memory stays flat
+    if len(timeline) > 1:
+        first, last = timeline[0], timeline[-1]
+        per_1k = (last["rss_mb"] - first["rss_mb"]) / max(1, last["jobs"] - first["jobs"]) * 1000
+        print(f"   RSS growth after warm-up: {per_1k:.2f} MB per 1k jobs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+In-process load generator for the FastAPI job API.
+
+Drives the `main.py` app through an ASGI transport with a stubbed crew backend, so
+no API keys or network access are needed. Usage (from the src directory):
+
+    python -m benchmarks.load_test --rate 20 --duration 30 --pollers 200 --burst-size 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_REQUEST = {
+    "product_name": "Office air conditioners",
+    "websites_list": ["www.amazon.com", "www.electroplanet.ma", "www.ikea.com"],
+    "country_name": "Morocco",
+    "no_keywords": 10,
+    "language": "English",
+    "score_th": 0.10,
+    "top_recommendations_no": 10
+}
+
+class StubCrewManager:
+    """Crew backend that sleeps instead of calling LLMs and search APIs"""
+
+    def __init__(self, job_seconds: float = 2.0, jitter: float = 0.5, failure_rate: float = 0.0,
+                 payload_bytes: int = 20000, validate_ms: float = 0.0):
+        self.job_seconds = job_seconds
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.payload_bytes = payload_bytes
+        self.validate_ms = validate_ms
+        self.output_dir = tempfile.mkdtemp(prefix="rankx_loadtest_")
+        self.settings = types.SimpleNamespace(
+            result_cache_bytes=64 * 1024 * 1024, max_concurrent_jobs=2, broker_url=None,
+            undated_job_wait_seconds=600.0, job_store_max_finished=1_000_000
+        )
+
+    def validate_inputs(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        # Busy-wait to reproduce the cost of validation running on the event loop
+        deadline = time.perf_counter() + self.validate_ms / 1000
+        while time.perf_counter() < deadline:
+            pass
+        errors = [f"Missing required field: {field}" for field in SAMPLE_REQUEST if field not in inputs]
+        return {"valid": len(errors) == 0, "errors": errors}
+
+    def execute_crew(self, inputs: Dict[str, Any], cassette_path: Optional[str] = None,
+                     job_id: Optional[str] = None, deadline: Any = None) -> Dict[str, Any]:
+        output_dir = os.path.join(self.output_dir, job_id) if job_id else self.output_dir
+        time.sleep(max(0.0, random.gauss(self.job_seconds, self.jitter)))
+        if random.random() < self.failure_rate:
+            return {"success": False, "error": "Stubbed failure", "output_directory": output_dir}
+        return {
+            "success": True,
+            "results": {"raw": "x" * self.payload_bytes},
+            "output_directory": output_dir
+        }
+
+def load_app(stub: StubCrewManager):
+    """Import main.py with the stub standing in for the real CrewManager"""
+    stub_module = types.ModuleType("crew_manager")
+    stub_module.CrewManager = lambda *args, **kwargs: stub
+    sys.modules["crew_manager"] = stub_module
+    sys.modules.pop("main", None)
+
+    import main
+    return main
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, when /proc is available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+class LoadTest:
+    """Arrival, polling and burst workloads against the job API"""
+
+    def __init__(self, app_module, args: argparse.Namespace):
+        self.main = app_module
+        self.args = args
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.requests: Dict[str, int] = defaultdict(int)
+        self.job_ids: List[str] = []
+        self.memory_samples: List[Dict[str, Any]] = []
+        self.loop_lag: List[float] = []
+        self.stop = asyncio.Event()
+
+    async def request(self, client, name: str, method: str, url: str, **kwargs):
+        self.requests[name] += 1
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            if response.status_code >= 400:
+                self.errors[name] += 1
+            return response
+        except Exception:
+            self.errors[name] += 1
+            return None
+        finally:
+            self.latencies[name].append(time.perf_counter() - start)
+
+    async def submit(self, client):
+        payload = SAMPLE_REQUEST
+        if random.random() < self.args.deadline_ratio:
+            payload = {**SAMPLE_REQUEST, "deadline_seconds": self.args.deadline_seconds}
+        response = await self.request(client, "POST /api/research", "POST", "/api/research", json=payload)
+        if response is not None and response.status_code == 200:
+            self.job_ids.append(response.json()["job_id"])
+
+    async def arrivals(self, client):
+        """Poisson arrivals at the configured rate"""
+        if self.args.rate <= 0:
+            return
+        tasks = []
+        while not self.stop.is_set():
+            tasks.append(asyncio.create_task(self.submit(client)))
+            await asyncio.sleep(random.expovariate(self.args.rate))
+        await asyncio.gather(*tasks)
+
+    async def bursts(self, client):
+        """Periodic bursts of simultaneous submissions"""
+        if self.args.burst_size <= 0:
+            return
+        while not self.stop.is_set():
+            await asyncio.gather(*(self.submit(client) for _ in range(self.args.burst_size)))
+            try:
+                await asyncio.wait_for(self.stop.wait(), timeout=self.args.burst_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def poller(self, client):
+        """Client polling the status of a random known job, plus the job list"""
+        while not self.stop.is_set():
+            await asyncio.sleep(self.args.poll_interval * random.uniform(0.5, 1.5))
+            if self.job_ids:
+                job_id = random.choice(self.job_ids)
+                await self.request(client, "GET /api/job/{id}/status", "GET", f"/api/job/{job_id}/status")
+            if random.random() < self.args.list_ratio:
+                await self.request(client, "GET /api/jobs", "GET", "/api/jobs")
+
+    async def monitor(self, started: float):
+        """Sample memory and event-loop lag while the test runs"""
+        while not self.stop.is_set():
+            before = time.perf_counter()
+            await asyncio.sleep(self.args.sample_interval)
+            self.loop_lag.append(max(0.0, time.perf_counter() - before - self.args.sample_interval))
+            traced, _ = tracemalloc.get_traced_memory()
+            self.memory_samples.append({
+                "t": round(time.perf_counter() - started, 2),
+                "rss_bytes": current_rss_bytes(),
+                "traced_bytes": traced,
+                "jobs": len(self.main.job_store)
+            })
+
+    async def run(self) -> Dict[str, Any]:
+        import httpx
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        transport = httpx.ASGITransport(app=self.main.app)
+        limits = httpx.Limits(max_connections=None)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=limits) as client:
+            workers = [
+                asyncio.create_task(self.arrivals(client)),
+                asyncio.create_task(self.bursts(client)),
+                asyncio.create_task(self.monitor(started)),
+                *(asyncio.create_task(self.poller(client)) for _ in range(self.args.pollers))
+            ]
+            await asyncio.sleep(self.args.duration)
+            self.stop.set()
+            await asyncio.gather(*workers)
+
+        drain_started = time.perf_counter()
+        while self.args.drain and time.perf_counter() - drain_started < self.args.drain_timeout:
+            if all(job["status"] in ("completed", "failed") for job in self.main.job_store.values()):
+                break
+            await asyncio.sleep(0.1)
+
+        tracemalloc.stop()
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {}
+        for name, values in sorted(self.latencies.items()):
+            endpoints[name] = {
+                "requests": self.requests[name],
+                "errors": self.errors[name],
+                "error_rate": self.errors[name] / self.requests[name] if self.requests[name] else 0.0,
+                "throughput_rps": self.requests[name] / elapsed,
+                **{f"p{pct}_ms": percentile(values, pct) * 1000 for pct in (50, 90, 99)},
+                "max_ms": max(values) * 1000
+            }
+
+        jobs = list(self.main.job_store.values())
+        turnaround = [
+            (job["completed_at"] - job["created_at"]).total_seconds()
+            for job in jobs if job.get("completed_at")
+        ]
+        statuses = defaultdict(int)
+        for job in jobs:
+            statuses[job["status"]] += 1
+
+        return {
+            "elapsed_seconds": elapsed,
+            "endpoints": endpoints,
+            "jobs": {
+                "submitted": len(jobs),
+                "statuses": dict(statuses),
+                "turnaround_p50_s": percentile(turnaround, 50),
+                "turnaround_p90_s": percentile(turnaround, 90),
+                "turnaround_p99_s": percentile(turnaround, 99)
+            },
+            "event_loop_lag_ms": {
+                "p50": (percentile(self.loop_lag, 50) or 0.0) * 1000,
+                "p99": (percentile(self.loop_lag, 99) or 0.0) * 1000,
+                "max": max(self.loop_lag, default=0.0) * 1000
+            },
+            "memory": self.memory_samples
+        }
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n⏱️  Elapsed: {report['elapsed_seconds']:.1f}s")
+    print("\n📊 Request latency")
+    print(f"{'endpoint':<28}{'reqs':>8}{'err%':>8}{'rps':>9}{'p50ms':>9}{'p90ms':>9}{'p99ms':>9}{'maxms':>9}")
+    for name, stats in report["endpoints"].items():
+        print(
+            f"{name:<28}{stats['requests']:>8}{stats['error_rate'] * 100:>8.2f}{stats['throughput_rps']:>9.1f}"
+            f"{stats['p50_ms']:>9.1f}{stats['p90_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}"
+        )
+
+    jobs = report["jobs"]
+    print(f"\n📦 Jobs: {jobs['submitted']} submitted, statuses {jobs['statuses']}")
+    if jobs["turnaround_p50_s"] is not None:
+        print(
+            f"   Turnaround p50 {jobs['turnaround_p50_s']:.2f}s, p90 {jobs['turnaround_p90_s']:.2f}s, "
+            f"p99 {jobs['turnaround_p99_s']:.2f}s"
+        )
+
+    lag = report["event_loop_lag_ms"]
+    print(f"\n🔁 Event-loop lag: p50 {lag['p50']:.1f}ms, p99 {lag['p99']:.1f}ms, max {lag['max']:.1f}ms")
+
+    print("\n💾 Memory over time")
+    print(f"{'t(s)':>8}{'jobs':>8}{'rss MB':>10}{'traced MB':>11}")
+    samples = report["memory"]
+    step = max(1, len(samples) // 20)
+    for sample in samples[::step]:
+        rss = sample["rss_bytes"] / 1e6 if sample["rss_bytes"] else float("nan")
+        print(f"{sample['t']:>8.1f}{sample['jobs']:>8}{rss:>10.1f}{sample['traced_bytes'] / 1e6:>11.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the RankX job API in-process")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load")
+    parser.add_argument("--rate", type=float, default=5.0, help="Mean job submissions per second")
+    parser.add_argument("--pollers", type=int, default=100, help="Number of concurrent polling clients")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Mean seconds between polls")
+    parser.add_argument("--list-ratio", type=float, default=0.05, help="Chance a poll also lists all jobs")
+    parser.add_argument("--burst-size", type=int, default=0, help="Submissions per burst (0 disables)")
+    parser.add_argument("--burst-interval", type=float, default=10.0, help="Seconds between bursts")
+    parser.add_argument("--job-seconds", type=float, default=2.0, help="Mean stubbed crew run time")
+    parser.add_argument("--job-jitter", type=float, default=0.5, help="Std-dev of stubbed crew run time")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of stubbed jobs that fail")
+    parser.add_argument("--payload-bytes", type=int, default=20000, help="Size of each stubbed result")
+    parser.add_argument("--deadline-ratio", type=float, default=0.0, help="Fraction of submissions with a deadline")
+    parser.add_argument("--deadline-seconds", type=float, default=90.0, help="Deadline of those submissions")
+    parser.add_argument("--validate-ms", type=float, default=0.0, help="Blocking time per input validation")
+    parser.add_argument("--sample-interval", type=float, default=0.5, help="Seconds between memory samples")
+    parser.add_argument("--drain", action="store_true", help="Wait for queued jobs to finish before reporting")
+    parser.add_argument("--drain-timeout", type=float, default=120.0, help="Maximum seconds to drain")
+    parser.add_argument("--json", dest="json_path", help="Also write the full report to this JSON file")
+    args = parser.parse_args()
+
+    stub = StubCrewManager(
+        job_seconds=args.job_seconds,
+        jitter=args.job_jitter,
+        failure_rate=args.failure_rate,
+        payload_bytes=args.payload_bytes,
+        validate_ms=args.validate_ms
+    )
+    app_module = load_app(stub)
+
+    print("🤖 RankX API load test")
+    print("=" * 50)
+    report = asyncio.run(LoadTest(app_module, args).run())
+    # Drop stubbed jobs still queued so the process exits promptly
+    app_module.scheduler.shutdown(wait=False, cancel_futures=True)
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📁 Report written to {args.json_path}")
+
+if __name__ == "__main__":
+    main()
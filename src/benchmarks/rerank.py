@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local BM25 reranker against the LLM selection path.
+
+Result sets are the raw, unranked search results of a job: its `step_2_search_candidates.json`
+(or the job directory holding it) or a recorded cassette (`*.jsonl.gz`, see CASSETTE_MODE=record).
+`step_2_search_results.json` is not used, since it only holds the pages already selected. Without
+arguments a synthetic set is used. Usage (from the src directory):
+
+    python -m benchmarks.rerank cassettes/*.jsonl.gz --product "Office air conditioners"
+    python -m benchmarks.rerank ai_agent_output/*/
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.reranker import rerank_results
+
+# Rough OpenAI tokenizer ratio for English text and JSON
+CHARS_PER_TOKEN = 4
+
+CANDIDATES_FILENAME = "step_2_search_candidates.json"
+
+def load_result_set(path: str) -> Dict[str, Any]:
+    """Candidates and, for cassettes, recorded latency of the LLM selection call"""
+    candidates: List[Dict[str, Any]] = []
+    llm_seconds = None
+    name = os.path.basename(os.path.normpath(path))
+
+    if path.endswith(".jsonl.gz"):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        for entry in entries:
+            response = entry["response"]
+            if entry["kind"] == "tavily" and isinstance(response, dict):
+                for result in response.get("results") or []:
+                    candidates.append({**result, "search_query": response.get("query", "")})
+            elif entry["kind"].startswith("llm:") and isinstance(response, str) and '"results"' in response:
+                # The search agent's final answer is the completion that lists the selected results
+                llm_seconds = entry["elapsed"]
+    else:
+        if os.path.isdir(path) or os.path.basename(path) == "step_2_search_results.json":
+            # Selected results would be ranked a second time; read the raw ones next to them
+            path = os.path.join(path if os.path.isdir(path) else os.path.dirname(path), CANDIDATES_FILENAME)
+        # Candidate files are named alike; the job directory tells them apart
+        name = os.path.basename(os.path.dirname(os.path.abspath(path)))
+        if not os.path.exists(path):
+            raise SystemExit(f"❌ {path} not found; jobs write it when their search stage finishes")
+        with open(path, encoding="utf-8") as f:
+            candidates = json.load(f).get("results", [])
+
+    return {"name": name, "candidates": candidates, "llm_seconds": llm_seconds}
+
+def synthetic_result_set(size: int) -> Dict[str, Any]:
+    words = ["inverter", "split", "btu", "wifi", "portable", "cooling", "heating", "energy", "class", "silent"]
+    brands = ["Samsung", "LG", "Midea", "Gree", "Daikin", "Hisense"]
+    hosts = ["www.amazon.com", "www.electroplanet.ma", "www.ikea.com", "blog.example.com", "www.jumia.ma"]
+    candidates = []
+    for i in range(size):
+        brand = random.choice(brands)
+        candidates.append({
+            "title": f"{brand} {' '.join(random.sample(words, 3))} air conditioner",
+            "url": f"https://{random.choice(hosts)}/product/{i}",
+            "content": " ".join(random.choices(words + brands, k=60)),
+            "score": random.random(),
+            "search_query": f"{brand} office air conditioner"
+        })
+    return {"name": f"synthetic-{size}", "candidates": candidates, "llm_seconds": None}
+
+def benchmark(result_set: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
+    candidates = result_set["candidates"]
+    timings = []
+    selected = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        selected = rerank_results(
+            candidates, args.product, spec_terms=args.terms, target_domains=args.websites,
+            top_k=args.top_k, score_th=args.score_th
+        )
+        timings.append(time.perf_counter() - started)
+
+    # The LLM path reads every candidate and writes back its selection
+    prompt_tokens = len(json.dumps(candidates, ensure_ascii=False)) // CHARS_PER_TOKEN
+    completion_tokens = len(json.dumps(selected, ensure_ascii=False)) // CHARS_PER_TOKEN
+    return {
+        "name": result_set["name"],
+        "candidates": len(candidates),
+        "selected": len(selected),
+        "rerank_ms": statistics.median(timings) * 1000,
+        "llm_prompt_tokens": prompt_tokens,
+        "llm_completion_tokens": completion_tokens,
+        "llm_seconds": result_set["llm_seconds"]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local reranker against LLM result selection")
+    parser.add_argument("paths", nargs="*", help="Job directories, step_2_search_candidates.json files or cassettes")
+    parser.add_argument("--product", default="Office air conditioners", help="Product name to rank against")
+    parser.add_argument("--terms", nargs="*", default=[], help="Extra spec terms")
+    parser.add_argument("--websites", nargs="*", default=["www.amazon.com", "www.electroplanet.ma", "www.ikea.com"])
+    parser.add_argument("--top-k", type=int, default=20, help="Number of pages to keep")
+    parser.add_argument("--score-th", type=float, default=None, help="Minimum search score")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed repetitions per result set")
+    parser.add_argument("--synthetic-size", type=int, default=200, help="Candidates in the synthetic set")
+    args = parser.parse_args()
+
+    result_sets = [load_result_set(path) for path in args.paths] or [synthetic_result_set(args.synthetic_size)]
+
+    print("🤖 RankX reranker benchmark")
+    print("=" * 50)
+    print(f"{'result set':<28}{'cands':>7}{'kept':>6}{'rerank ms':>11}{'llm in tok':>12}{'llm out tok':>13}{'llm s':>8}")
+    for result_set in result_sets:
+        row = benchmark(result_set, args)
+        llm_seconds = f"{row['llm_seconds']:.2f}" if row["llm_seconds"] is not None else "-"
+        print(
+            f"{row['name'][:27]:<28}{row['candidates']:>7}{row['selected']:>6}{row['rerank_ms']:>11.3f}"
+            f"{row['llm_prompt_tokens']:>12}{row['llm_completion_tokens']:>13}{llm_seconds:>8}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,65 @@
-from crewai import Crew, Process, LLM
-from crewai.knowledge.source.string_knowledge_source import StringKnowledgeSource
+from crewai import Crew, Process
 from tavily import TavilyClient
 from scrapegraphai import Client
+from contextlib import nullcontext
+import contextvars
+import logging
 import os
-from typing import List, Dict, Any
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
 import json
 
+from helpers.config import Settings, get_settings
+from helpers.llm_router import LLMRouter, AGENT_ROLES
+from helpers import cassette, tracing
+from helpers.deadline import JobDeadline
+from helpers.partial_report import render_partial_report
+from helpers.job_context import JobContext, current_job
+from helpers.reranker import rerank_results
+from helpers.query_planner import QueryPlan, SearchCoverage
+from helpers.context_compaction import compact_output
+from helpers.profiling import profile_job
+from helpers.price_refresh import refresh_prices
+from helpers.logging_config import setup_logging
+from helpers.knowledge_cache import create_embedder, load_knowledge_sources
+from helpers.jsonl_artifacts import ARTIFACT_FORMATS, ARTIFACT_COMPRESSIONS, jsonl_path
 from agent_A import AgentA
 from agent_B import AgentB
 from agent_C import AgentC
 from agent_D import AgentD
 
+logger = logging.getLogger(__name__)
+
 class CrewManager:
     """Main class to orchestrate all agents and manage the crew execution"""
     
-    def __init__(self):
+    def __init__(self, settings: Optional[Settings] = None):
+        self.settings = settings or get_settings()
+        setup_logging(
+            self.settings.log_level, self.settings.log_format,
+            self.settings.log_payload_max_chars, self.settings.log_payload_sample_every
+        )
         self.setup_environment()
         self.setup_clients()
         self.setup_knowledge_base()
         self.setup_agents()
+        self.setup_stage_hooks()
         
     def setup_environment(self):
         """Setup environment variables and basic configurations"""
-        # These should be set as environment variables or passed as parameters
-        self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        self.agentops_api_key = os.getenv("AGENTOPS_API_KEY")
-        self.tavily_api_key = os.getenv("TAVILY_API_KEY")
-        self.scrapegraph_api_key = os.getenv("SCRAPEGRAPH_API_KEY")
+        # These are loaded from environment variables or the .env file
+        self.openai_api_key = self.settings.openai_api_key
+        self.agentops_api_key = self.settings.agentops_api_key
+        self.tavily_api_key = self.settings.tavily_api_key
+        self.scrapegraph_api_key = self.settings.scrapegraph_api_key
         
-        # Setup basic LLM
-        self.basic_llm = LLM(model="gpt-4o", temperature=0)
+        # Setup per-agent LLM routing
+        self.llm_router = LLMRouter(self.settings)
+        self.basic_llm = self.llm_router.default_llm()
         
         # Setup output directory
-        self.output_dir = "./ai_agent_output"
+        self.output_dir = self.settings.output_dir
         os.makedirs(self.output_dir, exist_ok=True)
         
     def setup_clients(self):
@@ -40,19 +67,172 @@ class CrewManager:
         self.search_client = TavilyClient(api_key=self.tavily_api_key)
         self.scrape_client = Client(api_key=self.scrapegraph_api_key)
         
+        if self.settings.cassette_mode != "off":
+            cassette.install(self.search_client, "search", "tavily")
+            cassette.install(self.scrape_client, "smartscraper", "scrapegraph")
+            self.llm_router.add_instrument(
+                lambda llm: cassette.install(llm, "call", f"llm:{llm.model}")
+            )
+        
+        if self.settings.trace_enabled:
+            tracing.install(self.search_client, "search", "tool", "tavily.search", tracing.search_attributes)
+            tracing.install(self.scrape_client, "smartscraper", "tool", "scrapegraph.smartscraper", tracing.scrape_attributes)
+            self.llm_router.add_instrument(
+                lambda llm: tracing.install(llm, "call", "llm", f"llm:{llm.model}", tracing.llm_attributes(llm.model))
+            )
+        
     def setup_knowledge_base(self):
         """Setup company knowledge base"""
-        about_company = "RankX is a company that provides AI solutions to help websites refine their search and recommendation systems."
-        self.company_context = StringKnowledgeSource(content=about_company)
+        self.company_context = self.knowledge_sources()[0]
+        
+        # Embeddings are cached by chunk hash and model, so only new or edited chunks are embedded again
+        cache_dir = os.path.join(self.output_dir, ".cache") if self.settings.embedding_cache else None
+        recordable = self.settings.cassette_mode != "off"
+        self.embedder = create_embedder(
+            self.settings.embedder_provider, self.settings.embedder_model, self.openai_api_key, cache_dir,
+            recordable=recordable
+        )
+        if recordable:
+            # Replayed jobs read knowledge embeddings from the cassette, ahead of the local cache
+            cassette.install(self.embedder["provider"], "embed", f"embeddings:{self.settings.embedder_provider}")
+    
+    def knowledge_sources(self):
+        """Company description and documents, re-read for every crew so edits are picked up"""
+        return load_knowledge_sources(self.settings.company_description, self.settings.knowledge_paths)
         
     def setup_agents(self):
         """Initialize all agents"""
-        self.agent_a = AgentA(self.basic_llm, self.company_context)
-        self.agent_b = AgentB(self.basic_llm, self.search_client)
-        self.agent_c = AgentC(self.basic_llm, self.scrape_client)
-        self.agent_d = AgentD(self.basic_llm, self.company_context)
+        # Agent verbose output prints whole prompts and tool payloads; structured logs replace it
+        verbose = self.settings.agent_verbose
+        self.agent_a = AgentA(self.llm_router.for_agent("query"), self.company_context, verbose)
+        self.agent_b = AgentB(self.llm_router.for_agent("search"), self.search_client, verbose)
+        self.agent_c = AgentC(self.llm_router.for_agent("scrape"), self.scrape_client, verbose)
+        self.agent_d = AgentD(self.llm_router.for_agent("report"), self.company_context, verbose)
+        
+    def setup_stage_hooks(self):
+        """Hooks run on each task's output before the next task reads it"""
+        self.stage_hooks = {stage: [] for stage in AGENT_ROLES}
+        self.stage_hooks["query"].append(self.remember_queries)
+        self.stage_hooks["query"].append(self.plan_queries)
+        self.stage_hooks["search"].append(self.report_query_plan)
+        self.stage_hooks["search"].append(self.save_search_candidates)
+        self.stage_hooks["search"].append(self.rerank_search_results)
+        self.stage_hooks["search"].append(self.compact_context("scrape"))
+        self.stage_hooks["scrape"].append(self.stream_extracted_products)
+        self.stage_hooks["scrape"].append(self.compact_context("report"))
+        
+    def stage_callback(self, stage: str):
+        """Task callback running the hooks registered for a stage"""
+        def callback(output):
+            job = current_job()
+            if job is None:
+                return
+            logger.info("Stage finished", extra={"stage": stage, "output_chars": len(output.raw or "")})
+            for hook in self.stage_hooks[stage]:
+                hook(output, job)
+        return callback
+    
+    def remember_queries(self, output, job: JobContext):
+        """Keep the generated queries; their terms feed the reranker"""
+        job.queries = (output.json_dict or {}).get("queries", [])
+    
+    def plan_queries(self, output, job: JobContext):
+        """Hand the search agent deduplicated, per-website queries and watch for searches running dry"""
+        if not self.settings.query_planning:
+            return
+        
+        job.query_plan = QueryPlan(
+            job.queries,
+            job.inputs["websites_list"],
+            max_queries=job.inputs["no_keywords"],
+            threshold=self.settings.query_dedupe_threshold,
+            expand_domains=self.settings.query_expand_domains
+        )
+        job.search_coverage = SearchCoverage(self.settings.search_patience)
+        # Near-duplicates would only add noise to the reranker's query terms
+        job.queries = job.query_plan.kept
+        
+        output.json_dict = {"queries": job.query_plan.queries}
+        output.raw = json.dumps(output.json_dict, ensure_ascii=False)
+        self.write_output_file(job, "step_1_suggested_search_queries.json", output.json_dict)
+        logger.info("Queries planned", extra=job.query_plan.stats())
+    
+    def report_query_plan(self, output, job: JobContext):
+        """Record how many searches the query plan saved against searching every generated query once"""
+        if job.query_plan is None:
+            return
+        
+        coverage = job.search_coverage.stats()
+        # Negative when the per-site expansion issued more searches than the baseline
+        job.set_metric("query_plan", {
+            **job.query_plan.stats(),
+            **coverage,
+            "searches_saved": job.query_plan.baseline_searches - coverage["searches"]
+        })
+    
+    @staticmethod
+    def write_output_file(job: JobContext, filename: str, data: Any):
+        """Write a task output that a stage hook produced into the job directory"""
+        if not job.output_dir:
+            return
+        os.makedirs(job.output_dir, exist_ok=True)
+        with open(os.path.join(job.output_dir, filename), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    
+    def save_search_candidates(self, output, job: JobContext):
+        """Keep every raw search result, before any selection, for benchmarks/rerank.py"""
+        self.write_output_file(job, "step_2_search_candidates.json", {"results": job.search_candidates})
+    
+    def rerank_search_results(self, output, job: JobContext):
+        """Rank the raw search tool results locally and pass the top-K pages on as this task's output"""
+        if self.settings.search_ranking != "rerank":
+            return
+        
+        candidates = job.search_candidates
+        top_k = self.settings.rerank_top_k or 2 * job.inputs["top_recommendations_no"]
+        
+        started = time.perf_counter()
+        selected = rerank_results(
+            candidates,
+            product_name=job.inputs["product_name"],
+            spec_terms=job.queries,
+            target_domains=job.inputs["websites_list"],
+            top_k=top_k,
+            score_th=job.inputs.get("score_th")
+        )
+        elapsed = time.perf_counter() - started
+        
+        # The scraping task reads the raw output of this task as its context
+        output.json_dict = {"results": selected}
+        output.raw = json.dumps(output.json_dict, ensure_ascii=False)
+        # The task has no output file of its own, since the agent only confirms it searched
+        self.write_output_file(job, "step_2_search_results.json", output.json_dict)
+        job.set_metric("rerank", {
+            "candidates": len(candidates),
+            "selected": len(selected),
+            "milliseconds": round(elapsed * 1000, 3)
+        })
+        
+    def compact_context(self, consumer: str):
+        """Hook shrinking a task's raw output to what the `consumer` task reads, within its token budget"""
+        def hook(output, job: JobContext):
+            if not self.settings.context_compaction or not output.json_dict:
+                return
+            
+            # json_dict keeps every field for the stream and report files; only the prompt context shrinks
+            output.raw, stats = compact_output(
+                consumer,
+                output.json_dict,
+                output.raw or "",
+                max_tokens=getattr(self.settings, f"{consumer}_context_max_tokens"),
+                model=self.llm_router.model_config(consumer)["model"],
+                snippet_chars=self.settings.context_snippet_chars
+            )
+            job.set_metric("context_compaction", {**job.metrics.get("context_compaction", {}), consumer: stats})
+            logger.info("Context compacted", extra={"consumer": consumer, **stats})
+        return hook
         
-    def create_crew(self, inputs: Dict[str, Any]):
+    def create_crew(self, inputs: Dict[str, Any], output_dir: Optional[str] = None):
         """Create and configure the crew with all agents and tasks"""
         
         # Extract inputs
@@ -69,14 +249,34 @@ class CrewManager:
             product_name, websites_list, country_name, language, no_keywords
         )
         
+        # With local reranking the search agent only runs the searches; the tool results are ranked afterwards
         search_engine_task = self.agent_b.create_task(
-            product_name, websites_list, country_name
+            product_name, websites_list, country_name, collect_only=self.settings.search_ranking == "rerank"
         )
         
+        # Planned queries are written by plan_queries, after CrewAI would have saved the generated ones
+        if self.settings.query_planning:
+            search_queries_task.output_file = None
+        
         scraping_task = self.agent_c.create_task(top_recommendations_no)
         
         procurement_report_task = self.agent_d.create_task()
         
+        # Structured outputs that fail validation are converted by the fallback model
+        search_queries_task.converter_cls = self.llm_router.converter_for("query")
+        search_engine_task.converter_cls = self.llm_router.converter_for("search")
+        scraping_task.converter_cls = self.llm_router.converter_for("scrape")
+        
+        # Write each task's output file into this job's output directory
+        output_dir = output_dir or self.output_dir
+        tasks = (search_queries_task, search_engine_task, scraping_task, procurement_report_task)
+        for stage, task in zip(AGENT_ROLES, tasks):
+            if task.output_file:
+                task.output_file = os.path.join(output_dir, task.output_file)
+            task.callback = self.stage_callback(stage)
+            if self.settings.trace_enabled:
+                tracing.install(task, "execute_sync", "task", f"task:{stage}", self.task_attributes)
+        
         # Create crew
         crew = Crew(
             agents=[
@@ -92,28 +292,209 @@ class CrewManager:
                 procurement_report_task,
             ],
             process=Process.sequential,
-            knowledge_sources=[self.company_context]
+            knowledge_sources=self.knowledge_sources(),
+            embedder=self.embedder
         )
         
         return crew
     
-    def execute_crew(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    def open_cassette(self, inputs: Dict[str, Any], cassette_path: Optional[str] = None):
+        """Return the record/replay context for a job, or a no-op context when disabled"""
+        mode = self.settings.cassette_mode
+        if mode not in cassette.CASSETTE_MODES:
+            raise ValueError(f"Invalid cassette_mode: {mode}")
+        if mode == "off":
+            return nullcontext()
+        
+        path = cassette_path or os.path.join(self.settings.cassette_dir, cassette.cassette_name(inputs))
+        return cassette.Cassette(path, mode, self.settings.cassette_latency).activate()
+    
+    def stream_extracted_products(self, output, job: JobContext):
+        """Append each SingleExtractedProduct to the products stream once the scraping task returns"""
+        for product in (output.json_dict or {}).get("products", []):
+            job.stream("products", product)
+    
+    @staticmethod
+    def task_attributes(args, kwargs, output) -> Dict[str, Any]:
+        """Span attributes of a finished task"""
+        return {
+            "task.output_chars": len(output.raw or ""),
+            "task.agent": output.agent
+        }
+    
+    def open_tracer(self, output_dir: str):
+        """Return the tracing context for a job, or a no-op context when disabled"""
+        if not self.settings.trace_enabled:
+            return nullcontext()
+        
+        exporters = [tracing.JsonlSpanExporter(os.path.join(output_dir, tracing.TRACE_FILENAME))]
+        if self.settings.trace_otlp_endpoint:
+            exporters.append(tracing.OtlpHttpExporter(self.settings.trace_otlp_endpoint))
+        return tracing.Tracer(exporters).activate()
+    
+    def open_streams(self, job: JobContext, output_dir: str):
+        """Open the JSONL artifacts of a job when the jsonl output mode is enabled"""
+        artifact_format = self.settings.artifact_format
+        compression = self.settings.artifact_compression
+        if artifact_format not in ARTIFACT_FORMATS:
+            raise ValueError(f"Invalid artifact_format: {artifact_format}")
+        if compression not in ARTIFACT_COMPRESSIONS:
+            raise ValueError(f"Invalid artifact_compression: {compression}")
+        if artifact_format != "jsonl":
+            return
+        
+        job.open_stream("search_results", jsonl_path(output_dir, "step_2_search_results", compression))
+        job.open_stream("scraped_pages", jsonl_path(output_dir, "step_3_scraped_pages", compression))
+        job.open_stream("products", jsonl_path(output_dir, "step_3_search_results", compression))
+    
+    def job_output_dir(self, job_id: Optional[str] = None) -> str:
+        """Output directory for a job, or the shared one when no job id is given"""
+        return os.path.join(self.output_dir, job_id) if job_id else self.output_dir
+    
+    def run_crew(self, crew: Crew, inputs: Dict[str, Any], output_dir: str):
+        """Kick off the crew in this thread, under cProfile when the job asked to be profiled"""
+        if not inputs.get("profile"):
+            return crew.kickoff(inputs=inputs)
+        with profile_job(output_dir):
+            return crew.kickoff(inputs=inputs)
+    
+    def _kickoff(self, crew: Crew, inputs: Dict[str, Any], output_dir: str,
+                 deadline: Optional[JobDeadline] = None) -> Tuple[Any, bool]:
+        """Run the crew, returning (results, timed_out); with a deadline the crew runs in a worker thread"""
+        if deadline is None:
+            return self.run_crew(crew, inputs, output_dir), False
+        
+        outcome = {}
+        
+        def run():
+            try:
+                outcome["results"] = self.run_crew(crew, inputs, output_dir)
+            except Exception as e:
+                outcome["error"] = e
+        
+        # Copy the context so tools in the worker thread see the active deadline and cassette
+        context = contextvars.copy_context()
+        thread = threading.Thread(target=context.run, args=(run,), name="crew-kickoff", daemon=True)
+        thread.start()
+        thread.join(timeout=max(0.0, deadline.remaining()))
+        
+        if thread.is_alive():
+            # The crew thread raises DeadlineExceeded at its next LLM or tool call
+            deadline.expire()
+            # The abandoned crew must not overwrite the partial report
+            for task in crew.tasks:
+                task.output_file = None
+            return None, True
+        
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["results"], False
+    
+    def write_partial_report(self, crew: Optional[Crew], inputs: Dict[str, Any], deadline: JobDeadline,
+                             output_dir: str) -> Dict[str, Any]:
+        """Render the products extracted before the deadline as the job's report"""
+        products = []
+        for task in (crew.tasks if crew is not None else ()):
+            output = task.output
+            if output is not None and output.json_dict and "products" in output.json_dict:
+                products = output.json_dict["products"]
+        
+        os.makedirs(output_dir, exist_ok=True)
+        report_path = os.path.join(output_dir, "step_4_procurement_report.html")
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(render_partial_report(inputs, products, deadline.partial_pages, deadline.total_seconds))
+        
+        return {
+            "products": len(products),
+            "scraped_pages": len(deadline.partial_pages),
+            "skipped_calls": dict(deadline.skipped_calls)
+        }
+    
+    def execute_crew(self, inputs: Dict[str, Any], cassette_path: Optional[str] = None,
+                     job_id: Optional[str] = None, deadline: Optional[JobDeadline] = None) -> Dict[str, Any]:
         """Execute the crew with given inputs"""
+        output_dir = self.job_output_dir(job_id)
         try:
-            crew = self.create_crew(inputs)
-            results = crew.kickoff(inputs=inputs)
+            if deadline is not None and deadline.remaining() <= 0:
+                # The deadline passed while the job was queued: report that nothing was collected
+                deadline.expire()
+                logger.warning("Deadline expired before the job started", extra={"job_id": job_id})
+                return {
+                    "success": True,
+                    "results": None,
+                    "output_directory": output_dir,
+                    "llm_escalations": {role: 0 for role in AGENT_ROLES},
+                    "metrics": {},
+                    "partial": True,
+                    "partial_summary": self.write_partial_report(None, inputs, deadline, output_dir)
+                }
             
-            return {
+            job = JobContext(inputs, job_id=job_id, output_dir=output_dir)
+            logger.info("Job started", extra={"job_id": job_id, "product_name": inputs["product_name"]})
+            self.open_streams(job, output_dir)
+            try:
+                with self.open_tracer(output_dir), \
+                        tracing.span("execute_crew", "job", job_id=job_id, product_name=inputs["product_name"]) as root, \
+                        self.open_cassette(inputs, cassette_path) as active_cassette, job.activate(), \
+                        (deadline.activate() if deadline else nullcontext()):
+                    crew = self.create_crew(inputs, output_dir)
+                    results, timed_out = self._kickoff(crew, inputs, output_dir, deadline)
+                    
+                    root.set_attribute("partial", timed_out)
+                    token_usage = getattr(results, "token_usage", None)
+                    if token_usage is not None:
+                        root.set_attribute("llm.prompt_tokens", token_usage.prompt_tokens)
+                        root.set_attribute("llm.completion_tokens", token_usage.completion_tokens)
+                        root.set_attribute("llm.requests", token_usage.successful_requests)
+            finally:
+                job.close_streams()
+            
+            response = {
                 "success": True,
                 "results": results,
-                "output_directory": self.output_dir
+                "output_directory": output_dir,
+                "llm_escalations": {role: job.metrics.get("llm_escalations", {}).get(role, 0) for role in AGENT_ROLES},
+                "metrics": dict(job.metrics)
+            }
+            if timed_out:
+                response["partial"] = True
+                response["partial_summary"] = self.write_partial_report(crew, inputs, deadline, output_dir)
+            logger.info("Job finished", extra={"job_id": job_id, "partial": timed_out, "metrics": job.metrics})
+            if active_cassette is not None:
+                response["cassette"] = {
+                    "path": str(active_cassette.path),
+                    "mode": active_cassette.mode,
+                    **active_cassette.stats
+                }
+            return response
+            
+        except Exception as e:
+            logger.exception("Job failed", extra={"job_id": job_id})
+            return {
+                "success": False,
+                "error": str(e),
+                "output_directory": output_dir
+            }
+    
+    def refresh_prices(self, source_dir: str, job_id: Optional[str] = None) -> Dict[str, Any]:
+        """Re-scrape only the prices of a previous job's products, skipping query generation and search"""
+        output_dir = self.job_output_dir(job_id)
+        try:
+            summary = refresh_prices(
+                self.scrape_client, source_dir, output_dir, self.settings.price_refresh_workers
+            )
+            return {
+                "success": True,
+                "results": summary,
+                "output_directory": output_dir,
+                "price_changes": {key: summary[key] for key in ("products", "changed", "failed")}
             }
             
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e),
-                "output_directory": self.output_dir
+                "output_directory": output_dir
             }
     
     def validate_inputs(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
@@ -141,6 +522,13 @@ class CrewManager:
         if "top_recommendations_no" in inputs and not isinstance(inputs["top_recommendations_no"], int):
             errors.append("top_recommendations_no must be an integer")
         
+        deadline_seconds = inputs.get("deadline_seconds")
+        if deadline_seconds is not None and (not isinstance(deadline_seconds, (int, float)) or deadline_seconds <= 0):
+            errors.append("deadline_seconds must be a positive number")
+        
+        if "profile" in inputs and not isinstance(inputs["profile"], bool):
+            errors.append("profile must be a boolean")
+        
         return {
             "valid": len(errors) == 0,
             "errors": errors
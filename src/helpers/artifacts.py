@@ -0,0 +1,152 @@
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip variants are always written
+    brotli = None
+
+# Index and pre-compressed variants live in a subdirectory so they don't show up as job artifacts
+VARIANTS_DIRNAME = ".artifacts"
+INDEX_FILENAME = "index.json"
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript")
+MIN_COMPRESS_BYTES = 1024
+CHUNK_BYTES = 64 * 1024
+
+# A single "first-last", "first-" or "-suffix" byte range
+BYTE_RANGE_RE = re.compile(r"bytes=\s*(\d*)-(\d*)\s*", re.IGNORECASE)
+
+def _content_type(name: str) -> str:
+    if name.endswith(".jsonl"):
+        return "application/x-ndjson"
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _write_variant(path: Path, data: bytes) -> int:
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+def build_artifact_index(directory: str) -> Dict[str, Dict[str, Any]]:
+    """Index a job's files and write their gzip/brotli variants once"""
+    root = Path(directory)
+    variants_dir = root / VARIANTS_DIRNAME
+    variants_dir.mkdir(parents=True, exist_ok=True)
+
+    index = {}
+    for entry in sorted(os.scandir(root), key=lambda entry: entry.name):
+        if not entry.is_file():
+            continue
+        path = Path(entry.path)
+        stat = entry.stat()
+        content_type = _content_type(entry.name)
+        etag = _sha256(path)[:32]
+        record = {
+            "name": entry.name,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "etag": etag,
+            "content_type": content_type,
+            "encodings": {}
+        }
+
+        if stat.st_size >= MIN_COMPRESS_BYTES and content_type.startswith(COMPRESSIBLE_TYPES):
+            data = path.read_bytes()
+            record["encodings"]["gzip"] = _write_variant(
+                variants_dir / f"{entry.name}.gz", gzip.compress(data, compresslevel=9, mtime=0)
+            )
+            if brotli is not None:
+                record["encodings"]["br"] = _write_variant(
+                    variants_dir / f"{entry.name}.br", brotli.compress(data, quality=11)
+                )
+
+        index[entry.name] = record
+
+    with open(variants_dir / INDEX_FILENAME, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    return index
+
+def load_artifact_index(directory: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Previously built index of a job's files"""
+    path = Path(directory) / VARIANTS_DIRNAME / INDEX_FILENAME
+    if not path.is_file():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def variant_path(directory: str, name: str, encoding: Optional[str]) -> Path:
+    """Path of a file or of one of its pre-compressed variants"""
+    if encoding is None:
+        return Path(directory) / name
+    suffix = {"gzip": ".gz", "br": ".br"}[encoding]
+    return Path(directory) / VARIANTS_DIRNAME / f"{name}{suffix}"
+
+def choose_encoding(accept_encoding: str, available: Dict[str, int]) -> Optional[str]:
+    """Best pre-compressed variant acceptable to the client, preferring brotli"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if token:
+            accepted[token.lower()] = quality
+
+    for encoding in ("br", "gzip"):
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if encoding in available and quality > 0:
+            return encoding
+    return None
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive byte range of a single-range header, or None to serve the whole file; raises ValueError when unsatisfiable"""
+    # Missing, malformed, non-byte and multipart ranges are ignored and the whole file served (RFC 9110 14.2)
+    match = BYTE_RANGE_RE.fullmatch(range_header or "")
+    if not match:
+        return None
+    start_text, end_text = match.groups()
+    if start_text == "":
+        if end_text == "":
+            return None
+        length = int(end_text)
+        if length <= 0 or size == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size - 1
+
+    start = int(start_text)
+    if end_text and int(end_text) < start:
+        return None
+    if start >= size:
+        raise ValueError("Range not satisfiable")
+    end = min(int(end_text), size - 1) if end_text else size - 1
+    return start, end
+
+def iter_file(path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    """Stream a file, or an inclusive byte range of it, in fixed-size chunks"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = None if end is None else end - start + 1
+        while remaining is None or remaining > 0:
+            chunk = f.read(CHUNK_BYTES if remaining is None else min(CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,363 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import json
+import sqlite3
+import time
+
+from helpers.job_results import TERMINAL_STATUSES, to_jsonable
+
+try:
+    import redis
+except ImportError:  # only needed for redis:// broker URLs
+    redis = None
+
+
+REQUEUED_MESSAGE = "Worker stopped responding, job requeued..."
+ABANDONED_MESSAGE = "Job was abandoned by {attempts} worker(s)"
+
+def queue_priority(submitted_at: float, deadline_seconds: Optional[float], undated_wait_seconds: float) -> float:
+    """Earliest-deadline-first ordering key shared by all brokers; undated jobs are due after a fixed wait"""
+    return submitted_at + (deadline_seconds or undated_wait_seconds)
+
+def _encode(fields: Dict[str, Any]) -> Dict[str, Any]:
+    encoded = {}
+    for key, value in fields.items():
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif key in ("results", "payload") and value is not None:
+            value = json.dumps(value, ensure_ascii=False, default=to_jsonable)
+        encoded[key] = value
+    return encoded
+
+def _decode(record: Dict[str, Any]) -> Dict[str, Any]:
+    job = dict(record)
+    for key in ("results", "payload"):
+        if job.get(key):
+            job[key] = json.loads(job[key])
+    return job
+
+class JobBroker(ABC):
+    """Durable job queue shared by API nodes and worker processes"""
+
+    def __init__(self, lease_seconds: float = 60.0, max_attempts: int = 3, undated_wait_seconds: float = 600.0):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.undated_wait_seconds = undated_wait_seconds
+
+    def enqueue(self, job_id: str, job_type: str, payload: Dict[str, Any], progress: str,
+                deadline_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Store a pending job; returns its record"""
+        submitted_at = time.time()
+        job = {
+            "job_id": job_id,
+            "job_type": job_type,
+            "status": "pending",
+            "progress": progress,
+            "created_at": datetime.now(),
+            "completed_at": None,
+            "results": None,
+            "error": None,
+            "payload": payload,
+            "submitted_at": submitted_at,
+            "priority": queue_priority(submitted_at, deadline_seconds, self.undated_wait_seconds),
+            "attempts": 0,
+            "worker_id": None,
+        }
+        self._insert(_encode(job))
+        return job
+
+    @abstractmethod
+    def _insert(self, record: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Lease the most urgent pending job to a worker, redelivering jobs whose lease expired"""
+
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend a worker's lease; False when the worker no longer owns the job"""
+
+    @abstractmethod
+    def update(self, job_id: str, fields: Dict[str, Any], worker_id: Optional[str] = None) -> bool:
+        """Write status fields back; with a worker_id, only while that worker still holds the lease"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        ...
+
+class SQLiteBroker(JobBroker):
+    """Broker in a SQLite file, for workers on one host or on a shared volume with working locks"""
+
+    COLUMNS = (
+        "job_id", "job_type", "status", "progress", "created_at", "completed_at", "results", "error",
+        "payload", "submitted_at", "priority", "attempts", "worker_id", "lease_until"
+    )
+
+    def __init__(self, path: str, lease_seconds: float = 60.0, max_attempts: int = 3,
+                 undated_wait_seconds: float = 600.0):
+        super().__init__(lease_seconds, max_attempts, undated_wait_seconds)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, job_type TEXT NOT NULL, status TEXT NOT NULL, progress TEXT, "
+                "created_at TEXT NOT NULL, completed_at TEXT, results TEXT, error TEXT, payload TEXT, "
+                "submitted_at REAL NOT NULL, priority REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+                "worker_id TEXT, lease_until REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_leases ON jobs (status, lease_until)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction that holds the database lock from the first read"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _insert(self, record: Dict[str, Any]) -> None:
+        columns = [column for column in self.COLUMNS if column in record]
+        with self._transaction() as conn:
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [record[column] for column in columns]
+            )
+
+    def _requeue_expired(self, conn: sqlite3.Connection, now: float) -> None:
+        expired = conn.execute(
+            "SELECT job_id, attempts FROM jobs WHERE status = 'running' AND lease_until < ?", (now,)
+        ).fetchall()
+        for row in expired:
+            if row["attempts"] >= self.max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, completed_at = ?, lease_until = NULL WHERE job_id = ?",
+                    (ABANDONED_MESSAGE.format(attempts=row["attempts"]), datetime.now().isoformat(), row["job_id"])
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = 'pending', progress = ?, worker_id = NULL, lease_until = NULL WHERE job_id = ?",
+                    (REQUEUED_MESSAGE, row["job_id"])
+                )
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._transaction() as conn:
+            self._requeue_expired(conn, now)
+            row = conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'pending' ORDER BY priority LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker_id = ?, lease_until = ?, attempts = attempts + 1 "
+                "WHERE job_id = ?",
+                (worker_id, now + self.lease_seconds, row["job_id"])
+            )
+            job = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (row["job_id"],)).fetchone()
+        return _decode(dict(job))
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+                (time.time() + self.lease_seconds, job_id, worker_id)
+            )
+        return cursor.rowcount > 0
+
+    def update(self, job_id: str, fields: Dict[str, Any], worker_id: Optional[str] = None) -> bool:
+        values = _encode(fields)
+        if values.get("status") in TERMINAL_STATUSES:
+            values["lease_until"] = None
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        query = f"UPDATE jobs SET {assignments} WHERE job_id = ?"
+        params = [*values.values(), job_id]
+        if worker_id is not None:
+            query += " AND worker_id = ? AND status = 'running'"
+            params.append(worker_id)
+        with self._transaction() as conn:
+            cursor = conn.execute(query, params)
+        return cursor.rowcount > 0
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return _decode(dict(row)) if row else None
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT job_id, job_type, status, created_at, completed_at FROM jobs ORDER BY submitted_at"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+class RedisBroker(JobBroker):
+    """Broker on a Redis server, for workers spread over several hosts"""
+
+    def __init__(self, url: Optional[str] = None, client: Any = None, prefix: str = "rankx",
+                 lease_seconds: float = 60.0, max_attempts: int = 3, undated_wait_seconds: float = 600.0):
+        super().__init__(lease_seconds, max_attempts, undated_wait_seconds)
+        if client is None:
+            if redis is None:
+                raise RuntimeError("The redis broker requires the redis package")
+            client = redis.Redis.from_url(url, decode_responses=True)
+        # Any client speaking the redis-py API works; tests use fakeredis.FakeRedis(decode_responses=True)
+        self.client = client
+        self.queue_key = f"{prefix}:queue"
+        self.leases_key = f"{prefix}:leases"
+        self.jobs_key = f"{prefix}:jobs"
+        self.prefix = prefix
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    @staticmethod
+    def _to_hash(values: Dict[str, Any]) -> Dict[str, str]:
+        # Redis hashes cannot hold None; an empty string stands for a missing value
+        return {key: "" if value is None else str(value) for key, value in values.items()}
+
+    @staticmethod
+    def _from_hash(values: Dict[str, str]) -> Dict[str, Any]:
+        record = {key: (value if value != "" else None) for key, value in values.items()}
+        for key in ("submitted_at", "priority", "lease_until"):
+            if record.get(key) is not None:
+                record[key] = float(record[key])
+        record["attempts"] = int(record.get("attempts") or 0)
+        return _decode(record)
+
+    def _insert(self, record: Dict[str, Any]) -> None:
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(self._job_key(record["job_id"]), mapping=self._to_hash(record))
+        pipe.zadd(self.jobs_key, {record["job_id"]: record["submitted_at"]})
+        pipe.zadd(self.queue_key, {record["job_id"]: record["priority"]})
+        pipe.execute()
+
+    def _requeue_expired(self, now: float) -> None:
+        for job_id in self.client.zrangebyscore(self.leases_key, "-inf", now):
+            job_key = self._job_key(job_id)
+
+            def requeue(pipe):
+                lease_until = pipe.zscore(self.leases_key, job_id)
+                if lease_until is None or lease_until >= now:
+                    return
+                attempts = int(pipe.hget(job_key, "attempts") or 0)
+                priority = float(pipe.hget(job_key, "priority") or now)
+                pipe.multi()
+                pipe.zrem(self.leases_key, job_id)
+                if attempts >= self.max_attempts:
+                    pipe.hset(job_key, mapping=self._to_hash({
+                        "status": "failed",
+                        "error": ABANDONED_MESSAGE.format(attempts=attempts),
+                        "completed_at": datetime.now().isoformat(),
+                    }))
+                else:
+                    pipe.hset(job_key, mapping=self._to_hash({
+                        "status": "pending", "progress": REQUEUED_MESSAGE, "worker_id": None
+                    }))
+                    pipe.zadd(self.queue_key, {job_id: priority})
+
+            self.client.transaction(requeue, self.leases_key, job_key)
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        self._requeue_expired(now)
+
+        def take(pipe):
+            head = pipe.zrange(self.queue_key, 0, 0)
+            if not head:
+                return None
+            job_id = head[0]
+            pipe.multi()
+            pipe.zrem(self.queue_key, job_id)
+            pipe.zadd(self.leases_key, {job_id: now + self.lease_seconds})
+            pipe.hset(self._job_key(job_id), mapping=self._to_hash({
+                "status": "running", "worker_id": worker_id, "lease_until": now + self.lease_seconds
+            }))
+            pipe.hincrby(self._job_key(job_id), "attempts", 1)
+            return job_id
+
+        job_id = self.client.transaction(take, self.queue_key, value_from_callable=True)
+        return self.get(job_id) if job_id else None
+
+    def _owned(self, pipe, job_id: str, worker_id: str) -> bool:
+        owner, status = pipe.hmget(self._job_key(job_id), "worker_id", "status")
+        return owner == worker_id and status == "running"
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        lease_until = time.time() + self.lease_seconds
+
+        def extend(pipe):
+            if not self._owned(pipe, job_id, worker_id):
+                return False
+            pipe.multi()
+            pipe.zadd(self.leases_key, {job_id: lease_until})
+            pipe.hset(self._job_key(job_id), "lease_until", lease_until)
+            return True
+
+        return self.client.transaction(extend, self._job_key(job_id), value_from_callable=True)
+
+    def update(self, job_id: str, fields: Dict[str, Any], worker_id: Optional[str] = None) -> bool:
+        values = _encode(fields)
+        terminal = values.get("status") in TERMINAL_STATUSES
+        if terminal:
+            values["lease_until"] = None
+
+        def write(pipe):
+            if worker_id is not None and not self._owned(pipe, job_id, worker_id):
+                return False
+            if not pipe.exists(self._job_key(job_id)):
+                return False
+            pipe.multi()
+            pipe.hset(self._job_key(job_id), mapping=self._to_hash(values))
+            if terminal:
+                pipe.zrem(self.leases_key, job_id)
+            return True
+
+        return self.client.transaction(write, self._job_key(job_id), value_from_callable=True)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        values = self.client.hgetall(self._job_key(job_id))
+        return self._from_hash(values) if values else None
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        fields = ("job_id", "job_type", "status", "created_at", "completed_at")
+        pipe = self.client.pipeline(transaction=False)
+        for job_id in self.client.zrange(self.jobs_key, 0, -1):
+            pipe.hmget(self._job_key(job_id), *fields)
+        return [
+            {field: (value or None) for field, value in zip(fields, values)}
+            for values in pipe.execute()
+        ]
+
+def create_broker(url: str, lease_seconds: float = 60.0, max_attempts: int = 3,
+                  undated_wait_seconds: float = 600.0) -> JobBroker:
+    """Broker for a sqlite:///path/to/jobs.db or redis://host:port/db URL"""
+    if url.startswith("sqlite:///"):
+        return SQLiteBroker(url[len("sqlite:///"):], lease_seconds, max_attempts, undated_wait_seconds)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url, lease_seconds=lease_seconds, max_attempts=max_attempts,
+                           undated_wait_seconds=undated_wait_seconds)
+    raise ValueError(f"Unsupported broker URL: {url}")
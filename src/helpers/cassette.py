@@ -0,0 +1,154 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+import functools
+import gzip
+import hashlib
+import json
+import threading
+import time
+
+from helpers import tracing
+
+CASSETTE_MODES = ("off", "record", "replay")
+CASSETTE_LATENCIES = ("original", "zero")
+
+_active_cassette: ContextVar[Optional["Cassette"]] = ContextVar("active_cassette", default=None)
+
+class CassetteMiss(KeyError):
+    """Raised when a replayed call has no recorded response"""
+
+def _normalize(value: Any) -> Any:
+    """Reduce call arguments to a deterministic JSON-friendly structure"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_normalize(v) for v in value]
+    if hasattr(value, "model_dump"):
+        return _normalize(value.model_dump())
+    # Callbacks, clients and other live objects only contribute their type
+    return type(value).__name__
+
+def request_key(kind: str, args: tuple, kwargs: Dict[str, Any]) -> str:
+    """Stable hash identifying an external request"""
+    payload = json.dumps(
+        {"kind": kind, "args": _normalize(args), "kwargs": _normalize(kwargs)},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+def cassette_name(inputs: Dict[str, Any]) -> str:
+    """Default cassette file name for a set of crew inputs"""
+    return request_key("inputs", (), inputs)[:16] + ".jsonl.gz"
+
+class Cassette:
+    """Gzipped JSONL store of external responses, recorded live or served back locally"""
+
+    def __init__(self, path: str, mode: str, latency: str = "original"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Cassette mode must be 'record' or 'replay', got: {mode}")
+        if latency not in CASSETTE_LATENCIES:
+            raise ValueError(f"Cassette latency must be one of {CASSETTE_LATENCIES}, got: {latency}")
+
+        self.path = Path(path)
+        self.mode = mode
+        self.latency = latency
+        self.stats = {"recorded": 0, "replayed": 0, "recorded_seconds": 0.0}
+        self._responses = defaultdict(deque)
+        self._lock = threading.Lock()
+        self._file = None
+        self._closed = False
+
+        if mode == "replay":
+            self._load()
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _load(self):
+        """Index recorded responses by request key, keeping their order"""
+        if not self.path.exists():
+            raise FileNotFoundError(f"Cassette not found: {self.path}")
+
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._responses[entry["key"]].append(entry)
+
+    def call(self, kind: str, fn: Callable, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        """Run or replay a single external call"""
+        key = request_key(kind, args, kwargs)
+
+        if self.mode == "replay":
+            tracing.current_span().set_attribute("cache_hit", True)
+            return self._replay(kind, key)
+        tracing.current_span().set_attribute("cache_hit", False)
+
+        start = time.perf_counter()
+        response = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+
+        self._record({"kind": kind, "key": key, "elapsed": round(elapsed, 4), "response": response})
+        return response
+
+    def _replay(self, kind: str, key: str) -> Any:
+        with self._lock:
+            queue = self._responses.get(key)
+            if not queue:
+                raise CassetteMiss(f"No recorded {kind} response for request {key} in {self.path}")
+            # Repeated identical requests are served in recorded order; the last one is reused
+            entry = queue.popleft() if len(queue) > 1 else queue[0]
+            self.stats["replayed"] += 1
+
+        if self.latency == "original":
+            time.sleep(entry["elapsed"])
+        return entry["response"]
+
+    def _record(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._closed:
+                # Calls from a crew abandoned at its deadline arrive after the job has ended
+                return
+            if self._file is None:
+                self._file = gzip.open(self.path, "wt", encoding="utf-8")
+            self._file.write(line)
+            self.stats["recorded"] += 1
+            self.stats["recorded_seconds"] += entry["elapsed"]
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    @contextmanager
+    def activate(self):
+        """Route installed calls made in this context through the cassette"""
+        token = _active_cassette.set(self)
+        try:
+            yield self
+        finally:
+            _active_cassette.reset(token)
+            self.close()
+
+def install(obj: Any, method_name: str, kind: str) -> None:
+    """Patch an instance method so calls go through the active cassette, if any"""
+    original = getattr(obj, method_name)
+    if getattr(original, "_cassette_kind", None):
+        return
+
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        cassette = _active_cassette.get()
+        if cassette is None:
+            return original(*args, **kwargs)
+        return cassette.call(kind, original, args, kwargs)
+
+    wrapper._cassette_kind = kind
+    setattr(obj, method_name, wrapper)
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -15,7 +15,22 @@ class Settings(BaseSettings):
     # Application Settings
     app_env: str = "development"
     log_level: str = "INFO"
+    log_format: str = "json"  # "json" or "text"
+    log_payload_max_chars: int = 2000
+    log_payload_sample_every: int = 10
+    agent_verbose: bool = False
     max_concurrent_jobs: int = 2
+    # Jobs without a deadline are queued as if due this long after submission, so dated jobs cannot starve them
+    undated_job_wait_seconds: float = 600.0
+    result_cache_bytes: int = 64 * 1024 * 1024
+    job_store_max_finished: int = 1000
+    price_refresh_workers: int = 8
+    
+    # Multi-node workers (unset runs jobs in the API process; e.g. sqlite:///./jobs.db or redis://localhost:6379/0)
+    broker_url: Optional[str] = None
+    worker_lease_seconds: float = 60.0
+    worker_heartbeat_seconds: float = 15.0
+    job_max_attempts: int = 3
     
     # Directories
     output_dir: str = "./ai_agent_output"
@@ -23,6 +38,62 @@ class Settings(BaseSettings):
     # LLM Settings
     llm_model: str = "gpt-4o"
     llm_temperature: float = 0.0
+    llm_max_tokens: Optional[int] = None
+    llm_fallback_model: str = "gpt-4o"
+    
+    # Per-agent LLM routing (unset values fall back to the llm_* defaults)
+    query_agent_model: Optional[str] = "gpt-4o-mini"
+    query_agent_temperature: Optional[float] = None
+    query_agent_max_tokens: Optional[int] = 1024
+    search_agent_model: Optional[str] = "gpt-4o-mini"
+    search_agent_temperature: Optional[float] = None
+    search_agent_max_tokens: Optional[int] = 4096
+    scrape_agent_model: Optional[str] = None
+    scrape_agent_temperature: Optional[float] = None
+    scrape_agent_max_tokens: Optional[int] = None
+    report_agent_model: Optional[str] = None
+    report_agent_temperature: Optional[float] = None
+    report_agent_max_tokens: Optional[int] = None
+    
+    # Extra streaming artifacts ("json" only, or "jsonl" to also stream results as they are produced)
+    artifact_format: str = "json"
+    artifact_compression: str = "none"
+    
+    # Scrape target selection ("rerank" picks top-K locally, "llm" keeps the search agent's choice)
+    search_ranking: str = "rerank"
+    rerank_top_k: Optional[int] = None
+    
+    # Query planning: drop near-duplicate queries, expand them per target website and stop searching
+    # once `search_patience` searches in a row find no new pages (0 never stops early)
+    query_planning: bool = True
+    query_dedupe_threshold: float = 0.6
+    query_expand_domains: bool = True
+    search_patience: int = 3
+    
+    # Task outputs passed to the next agent keep only the fields it needs, within a token budget (0: no limit)
+    context_compaction: bool = True
+    scrape_context_max_tokens: int = 3000
+    report_context_max_tokens: int = 4000
+    context_snippet_chars: int = 300
+    
+    # Thread sampling through /api/admin/profile and SIGUSR1 on workers (off unless enabled)
+    admin_profiling: bool = False
+    profile_max_seconds: float = 60.0
+    
+    # Per-job tracing to <job dir>/trace.jsonl, optionally also sent to an OTLP/HTTP collector
+    trace_enabled: bool = True
+    trace_otlp_endpoint: Optional[str] = None
+    
+    # Record/replay of external calls ("off", "record" or "replay")
+    cassette_mode: str = "off"
+    cassette_dir: str = "./cassettes"
+    cassette_latency: str = "original"
+    
+    # Company knowledge embeddings ("openai" or the local "hashing" stand-in), cached across crews
+    knowledge_paths: List[str] = []
+    embedder_provider: str = "openai"
+    embedder_model: str = "text-embedding-3-small"
+    embedding_cache: bool = True
     
     # Default Company Context
     company_name: str = "RankX"
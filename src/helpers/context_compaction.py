@@ -0,0 +1,79 @@
+from typing import Any, Dict, List, Tuple
+import json
+
+from helpers.tracing import count_tokens
+
+# What each task reads from the previous task's output: records key, fields kept, fields trimmed
+CONTEXT_FIELDS = {
+    "scrape": ("results", ("url", "title", "score", "content"), ("content",)),
+    "report": (
+        "products",
+        (
+            "product_title", "product_url", "product_image_url", "product_current_price",
+            "product_original_price", "product_discount_percentage", "product_specs",
+            "agent_recommendation_rank", "agent_recommendation_notes",
+        ),
+        ("agent_recommendation_notes",),
+    ),
+}
+
+# Snippets are not trimmed below this before whole records are dropped
+MIN_SNIPPET_CHARS = 80
+
+def trim_text(text: str, max_chars: int) -> str:
+    """Collapse whitespace and cut at a word boundary, marking the cut"""
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0] or text[:max_chars]
+    return cut + "…"
+
+def project(record: Dict[str, Any], fields: Tuple[str, ...], trim_fields: Tuple[str, ...],
+            snippet_chars: int) -> Dict[str, Any]:
+    """Record reduced to `fields`, without empty values and with `trim_fields` shortened"""
+    compact = {}
+    for field in fields:
+        value = record.get(field)
+        if value is None or value == "" or value == []:
+            continue
+        if field in trim_fields:
+            if isinstance(value, str):
+                value = trim_text(value, snippet_chars)
+            elif isinstance(value, list):
+                value = [trim_text(item, snippet_chars) if isinstance(item, str) else item for item in value]
+        compact[field] = value
+    return compact
+
+def compact_output(consumer: str, data: Dict[str, Any], raw: str, max_tokens: int, model: str,
+                   snippet_chars: int = 300) -> Tuple[str, Dict[str, int]]:
+    """Raw context for the `consumer` task, shortening snippets and then dropping the last records until it fits"""
+    key, fields, trim_fields = CONTEXT_FIELDS[consumer]
+    records: List[Dict[str, Any]] = list(data.get(key) or [])
+    if consumer == "report":
+        # Drop the products the scraping agent ranked lowest first
+        records.sort(key=lambda product: product.get("agent_recommendation_rank") or 0, reverse=True)
+
+    def render(count: int, chars: int) -> str:
+        return json.dumps({key: [project(record, fields, trim_fields, chars) for record in records[:count]]},
+                          ensure_ascii=False)
+
+    count, chars = len(records), snippet_chars
+    text = render(count, chars)
+    tokens = count_tokens(model, text=text)
+    while max_tokens and tokens > max_tokens:
+        if chars > MIN_SNIPPET_CHARS:
+            chars = max(MIN_SNIPPET_CHARS, chars // 2)
+        elif count > 1:
+            count -= 1
+        else:
+            break
+        text = render(count, chars)
+        tokens = count_tokens(model, text=text)
+
+    return text, {
+        "tokens_before": count_tokens(model, text=raw),
+        "tokens_after": tokens,
+        "records_before": len(records),
+        "records_after": count,
+        "snippet_chars": chars
+    }
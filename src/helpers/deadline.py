@@ -0,0 +1,109 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+import threading
+import time
+
+# Share of the total time budget given to each stage, in pipeline order
+STAGE_FRACTIONS = {
+    "query": 0.10,
+    "search": 0.35,
+    "scrape": 0.40,
+    "report": 0.15,
+}
+
+DEADLINE_MESSAGE = "The time budget for this stage is exhausted. Stop calling tools and return the results collected so far."
+
+class DeadlineExceeded(Exception):
+    """Raised by LLM and tool calls of a crew that was abandoned at its job deadline"""
+
+class JobCancelled(DeadlineExceeded):
+    """Raised by LLM and tool calls of a job that was cancelled, e.g. after its worker lost the lease"""
+
+_current_deadline: ContextVar[Optional["JobDeadline"]] = ContextVar("current_deadline", default=None)
+_cancel_event: ContextVar[Optional[threading.Event]] = ContextVar("cancel_event", default=None)
+
+def current_deadline() -> Optional["JobDeadline"]:
+    """Deadline of the job running in this context, if it has one"""
+    return _current_deadline.get()
+
+def check_deadline():
+    """Stop the calling crew thread once its job's deadline has been reached or the job was cancelled"""
+    cancelled = _cancel_event.get()
+    if cancelled is not None and cancelled.is_set():
+        raise JobCancelled("Job was cancelled; the crew was abandoned")
+    deadline = _current_deadline.get()
+    if deadline is not None and deadline.expired:
+        raise DeadlineExceeded("Job deadline reached; the crew was abandoned")
+
+@contextmanager
+def cancel_on(event: threading.Event):
+    """Make LLM and tool calls in this context raise JobCancelled once `event` is set"""
+    token = _cancel_event.set(event)
+    try:
+        yield event
+    finally:
+        _cancel_event.reset(token)
+
+class JobDeadline:
+    """Time budget of a job, split into per-stage budgets"""
+
+    def __init__(self, total_seconds: float, started_at: Optional[float] = None):
+        self.total_seconds = total_seconds
+        self.started_at = time.monotonic() if started_at is None else started_at
+        self.deadline_at = self.started_at + total_seconds
+        self.expired = False
+        self.partial_pages: List[Dict[str, Any]] = []
+        self.skipped_calls = {stage: 0 for stage in STAGE_FRACTIONS}
+        self._call_seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        # Stages inherit the slack left by earlier stages, so budgets are cumulative
+        self._stage_ends = {}
+        elapsed_fraction = 0.0
+        for stage, fraction in STAGE_FRACTIONS.items():
+            elapsed_fraction += fraction
+            self._stage_ends[stage] = self.started_at + elapsed_fraction * total_seconds
+
+    def remaining(self) -> float:
+        """Seconds left before the job deadline"""
+        return self.deadline_at - time.monotonic()
+
+    def stage_remaining(self, stage: str) -> float:
+        """Seconds left before the end of a stage's budget"""
+        return self._stage_ends[stage] - time.monotonic()
+
+    def record_call(self, stage: str, seconds: float):
+        """Track how long a tool call took, as a moving average per stage"""
+        with self._lock:
+            previous = self._call_seconds.get(stage)
+            self._call_seconds[stage] = seconds if previous is None else 0.7 * previous + 0.3 * seconds
+
+    def should_stop(self, stage: str) -> bool:
+        """True when another tool call would likely overrun the stage budget"""
+        if self.expired:
+            return True
+        expected = self._call_seconds.get(stage, 0.0)
+        if self.stage_remaining(stage) > expected:
+            return False
+        with self._lock:
+            self.skipped_calls[stage] += 1
+        return True
+
+    def record_partial(self, page: Dict[str, Any]):
+        """Keep scraped page details for a partial report"""
+        with self._lock:
+            self.partial_pages.append(page)
+
+    def expire(self):
+        """Mark the deadline as reached so further LLM and tool calls raise DeadlineExceeded"""
+        self.expired = True
+
+    @contextmanager
+    def activate(self):
+        """Make this deadline visible to tools called in this context"""
+        token = _current_deadline.set(self)
+        try:
+            yield self
+        finally:
+            _current_deadline.reset(token)
@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+import threading
+
+from helpers.jsonl_artifacts import JsonlWriter
+from helpers.query_planner import QueryPlan, SearchCoverage
+
+_current_job: ContextVar[Optional["JobContext"]] = ContextVar("current_job", default=None)
+
+def current_job() -> Optional["JobContext"]:
+    """Job running in this context, if any"""
+    return _current_job.get()
+
+class JobContext:
+    """Per-job state shared between CrewManager, agent tools and task callbacks"""
+
+    def __init__(self, inputs: Dict[str, Any], job_id: Optional[str] = None, output_dir: Optional[str] = None):
+        self.inputs = inputs
+        self.job_id = job_id
+        self.output_dir = output_dir
+        self.queries: List[str] = []
+        self.query_plan: Optional[QueryPlan] = None
+        self.search_coverage: Optional[SearchCoverage] = None
+        self.search_candidates: List[Dict[str, Any]] = []
+        self.metrics: Dict[str, Any] = {}
+        self.streams: Dict[str, JsonlWriter] = {}
+        self._lock = threading.Lock()
+
+    def open_stream(self, name: str, path: str):
+        """Start a JSONL artifact that records are streamed to as they are produced"""
+        self.streams[name] = JsonlWriter(path)
+
+    def stream(self, name: str, record: Any):
+        """Append a record to a stream, if the job has one with that name"""
+        writer = self.streams.get(name)
+        if writer is not None:
+            writer.write(record)
+
+    def close_streams(self):
+        for writer in self.streams.values():
+            writer.close()
+
+    def add_search_results(self, query: str, response: Any):
+        """Collect raw Tavily results as SingleSearchResult-shaped dicts"""
+        if not isinstance(response, dict):
+            return
+        for result in response.get("results") or []:
+            candidate = {
+                "title": result.get("title", ""),
+                "url": result.get("url", ""),
+                "content": result.get("content", ""),
+                "score": result.get("score", 0.0),
+                "search_query": query
+            }
+            with self._lock:
+                self.search_candidates.append(candidate)
+            self.stream("search_results", candidate)
+
+    def set_metric(self, name: str, value: Any):
+        with self._lock:
+            self.metrics[name] = value
+
+    def count_metric(self, name: str, key: str, amount: int = 1):
+        """Add to a counter inside a dict-valued metric"""
+        with self._lock:
+            counters = self.metrics.setdefault(name, {})
+            counters[key] = counters.get(key, 0) + amount
+
+    @contextmanager
+    def activate(self):
+        """Make this job visible to tools and callbacks called in this context"""
+        token = _current_job.set(self)
+        try:
+            yield self
+        finally:
+            _current_job.reset(token)
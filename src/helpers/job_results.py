@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+import json
+import os
+import threading
+
+from helpers.artifacts import build_artifact_index
+
+RESULTS_FILENAME = "crew_results.json"
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+# Small scalar entries of execute_crew results that are kept in the job summary
+SUMMARY_KEYS = (
+    "success", "output_directory", "llm_escalations", "cassette",
+    "partial", "partial_summary", "metrics", "price_changes"
+)
+
+def to_jsonable(value: Any) -> Any:
+    """json.dumps hook for CrewOutput, TaskOutput and other pydantic objects"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+class JobResultStore:
+    """Keep compact job summaries in memory, full results on disk and an LRU of hot results"""
+
+    def __init__(self, results_dir: str, cache_bytes: int = 64 * 1024 * 1024):
+        self.results_dir = Path(results_dir)
+        self.cache_bytes = cache_bytes
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def save(self, job_id: str, results: Dict[str, Any]) -> Dict[str, Any]:
+        """Write full results to disk and return the summary to keep in job_store"""
+        directory = Path(results.get("output_directory") or self.results_dir / job_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        result_path = directory / RESULTS_FILENAME
+
+        # Index the job's artifacts and pre-compress them once, before adding the results file
+        artifacts = build_artifact_index(str(directory))
+
+        payload = json.dumps(results, ensure_ascii=False, default=to_jsonable).encode("utf-8")
+        tmp_path = result_path.with_suffix(".tmp")
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, result_path)
+
+        summary = {key: results[key] for key in SUMMARY_KEYS if key in results}
+        token_usage = getattr(results.get("results"), "token_usage", None)
+        if token_usage is not None:
+            summary["token_usage"] = to_jsonable(token_usage)
+        summary["result_path"] = str(result_path)
+        summary["result_bytes"] = len(payload)
+        summary["artifacts"] = artifacts
+        return summary
+
+    def load(self, job_id: str, summary: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return full results for a job, reading them from disk on a cache miss"""
+        with self._lock:
+            if job_id in self._cache:
+                self._cache.move_to_end(job_id)
+                self.stats["hits"] += 1
+                return self._cache[job_id][0]
+            self.stats["misses"] += 1
+
+        result_path = Path(summary.get("result_path", ""))
+        if not result_path.is_file():
+            return None
+
+        payload = result_path.read_bytes()
+        results = json.loads(payload)
+        self._remember(job_id, results, len(payload))
+        return results
+
+    def _remember(self, job_id: str, results: Dict[str, Any], size: int):
+        """Insert into the LRU, evicting cold entries beyond the byte budget"""
+        if size > self.cache_bytes:
+            return
+
+        with self._lock:
+            if job_id in self._cache:
+                return
+            self._cache[job_id] = (results, size)
+            self._cached_bytes += size
+            while self._cached_bytes > self.cache_bytes:
+                _, (_, evicted_size) = self._cache.popitem(last=False)
+                self._cached_bytes -= evicted_size
+                self.stats["evictions"] += 1
+
+    def forget(self, job_id: str):
+        """Drop a job from the hot cache"""
+        with self._lock:
+            entry = self._cache.pop(job_id, None)
+            if entry is not None:
+                self._cached_bytes -= entry[1]
+
+    @property
+    def cached_bytes(self) -> int:
+        return self._cached_bytes
+
+class JobStore(OrderedDict):
+    """In-process job records that keep at most `max_finished` finished jobs, dropping the oldest first"""
+
+    def __init__(self, max_finished: int = 1000):
+        super().__init__()
+        self.max_finished = max_finished
+        self.evictions = 0
+
+    def __setitem__(self, job_id: str, job: Dict[str, Any]):
+        super().__setitem__(job_id, job)
+        self.evict_finished()
+
+    def evict_finished(self):
+        """Forget the earliest-created finished jobs beyond the cap; running jobs are never evicted"""
+        finished = [job_id for job_id, job in self.items() if job.get("status") in TERMINAL_STATUSES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self[job_id]
+            self.evictions += 1
@@ -0,0 +1,77 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+import logging
+
+from helpers.deadline import JobDeadline
+from helpers.job_results import JobResultStore
+
+# Receives the job fields to change, e.g. job_store[job_id].update or a broker update
+JobUpdate = Callable[[Dict[str, Any]], Any]
+
+# Confirms the caller still owns the job before its results are written, e.g. by renewing a broker lease
+LeaseCheck = Callable[[], bool]
+
+logger = logging.getLogger(__name__)
+
+def _lost_lease(job_id: str, owns_job: Optional[LeaseCheck]) -> bool:
+    if owns_job is None or owns_job():
+        return False
+    # Another worker has taken the job over and writes to the same job directory
+    logger.warning("Lost the job's lease; not saving its results", extra={"job_id": job_id})
+    return True
+
+def run_research_job(crew_manager: Any, result_store: JobResultStore, job_id: str, inputs: Dict[str, Any],
+                     deadline: Optional[JobDeadline], update: JobUpdate, owns_job: Optional[LeaseCheck] = None):
+    """Run the crew for a research job and report its progress and results"""
+    try:
+        update({"status": "running", "progress": "Initializing agents..."})
+
+        # Execute the crew
+        results = crew_manager.execute_crew(inputs, job_id=job_id, deadline=deadline)
+
+        if results["success"]:
+            if _lost_lease(job_id, owns_job):
+                return
+            update({
+                "status": "completed",
+                "results": result_store.save(job_id, results),
+                "completed_at": datetime.now(),
+                "progress": "Deadline reached, partial report generated." if results.get("partial")
+                            else "Task completed successfully!"
+            })
+        else:
+            update({
+                "status": "failed",
+                "error": results.get("error", "Unknown error"),
+                "completed_at": datetime.now()
+            })
+
+    except Exception as e:
+        update({"status": "failed", "error": str(e), "completed_at": datetime.now()})
+
+def run_refresh_job(crew_manager: Any, result_store: JobResultStore, job_id: str, source_dir: str,
+                    update: JobUpdate, owns_job: Optional[LeaseCheck] = None):
+    """Re-scrape the prices of a previous job and report the results"""
+    try:
+        update({"status": "running", "progress": "Refreshing product prices..."})
+
+        results = crew_manager.refresh_prices(source_dir, job_id=job_id)
+
+        if results["success"]:
+            if _lost_lease(job_id, owns_job):
+                return
+            update({
+                "status": "completed",
+                "results": result_store.save(job_id, results),
+                "completed_at": datetime.now(),
+                "progress": f"{results['price_changes']['changed']} price(s) changed."
+            })
+        else:
+            update({
+                "status": "failed",
+                "error": results.get("error", "Unknown error"),
+                "completed_at": datetime.now()
+            })
+
+    except Exception as e:
+        update({"status": "failed", "error": str(e), "completed_at": datetime.now()})
@@ -0,0 +1,139 @@
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Tuple, Type
+import io
+import json
+import os
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:  # zstd output is optional
+    zstandard = None
+
+ARTIFACT_FORMATS = ("json", "jsonl")
+ARTIFACT_COMPRESSIONS = ("none", "zstd")
+
+def jsonl_path(output_dir: str, stem: str, compression: str = "none") -> str:
+    """Path of a JSONL artifact, e.g. step_2_search_results.jsonl(.zst)"""
+    suffix = ".jsonl.zst" if compression == "zstd" else ".jsonl"
+    return os.path.join(output_dir, stem + suffix)
+
+def _to_record(record: Any) -> Any:
+    if hasattr(record, "model_dump"):
+        return record.model_dump()
+    return record
+
+class JsonlWriter:
+    """JSONL writer that makes every record readable as soon as it is written"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.compressed = self.path.suffix == ".zst"
+        if self.compressed and zstandard is None:
+            raise RuntimeError("zstd artifact compression requires the zstandard package")
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Start afresh: a redelivered job or the shared output directory may hold a previous run's records
+        self._file = open(self.path, "wb")
+        self._compressor = zstandard.ZstdCompressor(level=3) if self.compressed else None
+        self._lock = threading.Lock()
+        self.records = 0
+
+    def write(self, record: Any) -> None:
+        line = (json.dumps(_to_record(record), ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self._file is None:
+                return
+            # One zstd frame per record keeps the file decodable while it grows
+            self._file.write(self._compressor.compress(line) if self._compressor else line)
+            self._file.flush()
+            self.records += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _read_lines(path: Path) -> Iterator[bytes]:
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError("Reading zstd artifacts requires the zstandard package")
+        with open(path, "rb") as f:
+            reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+            try:
+                yield from io.BufferedReader(reader)
+            except zstandard.ZstdError:
+                # The last frame is still being appended
+                return
+    else:
+        with open(path, "rb") as f:
+            yield from f
+
+def _complete_lines(path: Path) -> Iterator[bytes]:
+    for line in _read_lines(path):
+        # A record still being appended has no newline yet
+        if not line.endswith(b"\n"):
+            return
+        yield line
+
+def _parse(line: bytes, model: Optional[Type]) -> Any:
+    record = json.loads(line)
+    return model.model_validate(record) if model is not None else record
+
+def iter_jsonl(path: str, model: Optional[Type] = None) -> Iterator[Any]:
+    """Stream records from a JSONL artifact in constant memory, optionally as pydantic models"""
+    for line in _complete_lines(Path(path)):
+        if line.strip():
+            yield _parse(line, model)
+
+def _read_appended(path: Path, offset: int) -> Tuple[bytes, int]:
+    """Data appended after `offset` and the offset to resume from, stopping before a partial zstd frame"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    if path.suffix != ".zst":
+        return data, offset + len(data)
+
+    if zstandard is None:
+        raise RuntimeError("Reading zstd artifacts requires the zstandard package")
+    decoded = []
+    while data:
+        frame = zstandard.ZstdDecompressor().decompressobj()
+        chunk = frame.decompress(data)
+        if not frame.eof:
+            # The writer is still appending this frame; read it again next time
+            break
+        decoded.append(chunk)
+        offset += len(data) - len(frame.unused_data)
+        data = frame.unused_data
+    return b"".join(decoded), offset
+
+def tail_jsonl(path: str, model: Optional[Type] = None, poll_interval: float = 0.5,
+               done: Callable[[], bool] = lambda: True) -> Iterator[Any]:
+    """Yield records as they are appended, until done() is true and everything written has been read"""
+    # Each poll only reads what was appended since the last one
+    offset = 0
+    pending = b""
+    while True:
+        finished = done()
+        if os.path.exists(path):
+            if os.path.getsize(path) < offset:
+                # A new run of the job started the file again
+                offset, pending = 0, b""
+            data, offset = _read_appended(Path(path), offset)
+            # A record still being appended has no newline yet
+            *lines, pending = (pending + data).split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield _parse(line, model)
+        if finished:
+            return
+        time.sleep(poll_interval)
@@ -0,0 +1,167 @@
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+
+from chromadb import Documents, EmbeddingFunction, Embeddings
+from crewai.knowledge.source.string_knowledge_source import StringKnowledgeSource
+
+from helpers import tracing
+from helpers.job_context import current_job
+
+EMBEDDER_PROVIDERS = ("openai", "hashing")
+CACHE_FILENAME = "embeddings.sqlite3"
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """SQLite store of embeddings keyed by embedder model and chunk content hash"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, digest TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, digest))"
+        )
+        self._conn.commit()
+
+    def get_many(self, model: str, digests: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        unique = list(dict.fromkeys(digests))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT digest, vector FROM embeddings WHERE model = ? AND digest IN ({','.join('?' * len(batch))})",
+                    [model, *batch]
+                ).fetchall()
+                for digest, blob in rows:
+                    found[digest] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, List[float]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, digest, vector) VALUES (?, ?, ?)",
+                [(model, digest, array("f", vector).tobytes()) for digest, vector in vectors.items()]
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    """Embedding function that only sends chunks it has never embedded with this model"""
+
+    def __init__(self, inner: EmbeddingFunction, model: str, cache: EmbeddingCache):
+        self.inner = inner
+        self.model = model
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, input: Documents) -> Embeddings:
+        with tracing.span("embeddings", "embed", model=self.model, chunks=len(input)) as active:
+            digests = [text_digest(text) for text in input]
+            cached = self.cache.get_many(self.model, digests)
+
+            missing = {}
+            for digest, text in zip(digests, input):
+                if digest not in cached:
+                    missing.setdefault(digest, text)
+            if missing:
+                vectors = self.inner(list(missing.values()))
+                fresh = {digest: [float(x) for x in vector] for digest, vector in zip(missing, vectors)}
+                self.cache.put_many(self.model, fresh)
+                cached.update(fresh)
+
+            hits = len(input) - len(missing)
+            active.set_attribute("cache_hits", hits)
+            active.set_attribute("cache_misses", len(missing))
+        self.hits += hits
+        self.misses += len(missing)
+        job = current_job()
+        if job:
+            job.count_metric("embedding_cache", "hits", hits)
+            job.count_metric("embedding_cache", "misses", len(missing))
+
+        return [cached[digest] for digest in digests]
+
+class HashingEmbeddingFunction(EmbeddingFunction):
+    """Deterministic local embedder (hashed bag of words) for tests and offline runs"""
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+
+    def __call__(self, input: Documents) -> Embeddings:
+        embeddings = []
+        for text in input:
+            vector = [0.0] * self.dimensions
+            for token in TOKEN_RE.findall(text.lower()):
+                digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+                index = int.from_bytes(digest[:4], "little") % self.dimensions
+                vector[index] += 1.0 if digest[4] & 1 else -1.0
+            norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+            embeddings.append([x / norm for x in vector])
+        return embeddings
+
+class RecordedEmbeddingFunction(EmbeddingFunction):
+    """Embedding function whose calls go through embed(), so a cassette can record and replay them
+
+    __call__ is looked up on the class, which an instance patch cannot reach.
+    """
+
+    def __init__(self, inner: EmbeddingFunction):
+        self.inner = inner
+
+    def embed(self, input: Documents) -> List[List[float]]:
+        return [[float(x) for x in vector] for vector in self.inner(input)]
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return self.embed(input)
+
+def create_embedder(provider: str, model: str, api_key: Optional[str], cache_dir: Optional[str],
+                    recordable: bool = False) -> Dict[str, Any]:
+    """CrewAI embedder config for knowledge sources, cached on disk unless cache_dir is None
+
+    CrewAI accepts an EmbeddingFunction instance as the provider and uses it as is.
+    With recordable the embedder is wrapped in a RecordedEmbeddingFunction for cassettes.
+    """
+    if provider not in EMBEDDER_PROVIDERS:
+        raise ValueError(f"Invalid embedder_provider: {provider}")
+
+    if provider == "hashing":
+        inner = HashingEmbeddingFunction()
+        model = f"hashing-{inner.dimensions}"
+    else:
+        from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
+        inner = OpenAIEmbeddingFunction(api_key=api_key, model_name=model)
+
+    embedder = inner
+    if cache_dir:
+        embedder = CachedEmbeddingFunction(inner, f"{provider}:{model}", EmbeddingCache(str(Path(cache_dir) / CACHE_FILENAME)))
+    if recordable:
+        embedder = RecordedEmbeddingFunction(embedder)
+    return {"provider": embedder}
+
+def load_knowledge_sources(company_description: str, paths: List[str]) -> List[StringKnowledgeSource]:
+    """Company description plus one knowledge source per company document"""
+    sources = [StringKnowledgeSource(content=company_description)]
+    for path in paths:
+        content = Path(path).read_text(encoding="utf-8")
+        if content.strip():
+            sources.append(StringKnowledgeSource(content=content))
+    return sources
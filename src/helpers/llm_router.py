@@ -0,0 +1,137 @@
+from typing import Callable, Dict, Any, List, Optional, Tuple, Type
+import threading
+
+from crewai import LLM
+from crewai.utilities.converter import Converter
+
+from helpers.config import Settings
+from helpers.deadline import check_deadline
+from helpers.job_context import current_job
+from helpers.output_repair import repair_output
+
+AGENT_ROLES = ("query", "search", "scrape", "report")
+
+def guard_deadline(llm: LLM) -> None:
+    """Make an LLM refuse calls from a crew that was abandoned at its deadline"""
+    call = llm.call
+
+    def wrapper(*args, **kwargs):
+        check_deadline()
+        return call(*args, **kwargs)
+
+    llm.call = wrapper
+
+class LLMRouter:
+    """Build per-agent LLMs from Settings and escalate to a larger model on structured-output failures"""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self._llms: Dict[Tuple[str, float, Optional[int]], LLM] = {}
+        self._lock = threading.Lock()
+        self._instruments: List[Callable[[LLM], None]] = [guard_deadline]
+        self.escalations = {role: 0 for role in AGENT_ROLES}
+
+    def add_instrument(self, instrument: Callable[[LLM], None]) -> None:
+        """Apply a hook to every LLM this router has built or will build"""
+        with self._lock:
+            self._instruments.append(instrument)
+            llms = list(self._llms.values())
+        for llm in llms:
+            instrument(llm)
+
+    def model_config(self, role: str) -> Dict[str, Any]:
+        """Resolve model, temperature and max tokens for an agent role"""
+        if role not in AGENT_ROLES:
+            raise ValueError(f"Unknown agent role: {role}")
+
+        model = getattr(self.settings, f"{role}_agent_model") or self.settings.llm_model
+        temperature = getattr(self.settings, f"{role}_agent_temperature")
+        max_tokens = getattr(self.settings, f"{role}_agent_max_tokens")
+
+        return {
+            "model": model,
+            "temperature": self.settings.llm_temperature if temperature is None else temperature,
+            "max_tokens": self.settings.llm_max_tokens if max_tokens is None else max_tokens
+        }
+
+    def _build_llm(self, model: str, temperature: float, max_tokens: Optional[int]) -> LLM:
+        """Create an LLM once per distinct configuration"""
+        key = (model, temperature, max_tokens)
+        with self._lock:
+            if key not in self._llms:
+                kwargs = {"model": model, "temperature": temperature}
+                if max_tokens:
+                    kwargs["max_tokens"] = max_tokens
+                # Pass the key explicitly rather than relying on a process-wide OPENAI_API_KEY
+                if self.settings.openai_api_key and ("/" not in model or model.startswith("openai/")):
+                    kwargs["api_key"] = self.settings.openai_api_key
+                llm = LLM(**kwargs)
+                for instrument in self._instruments:
+                    instrument(llm)
+                self._llms[key] = llm
+            return self._llms[key]
+
+    def default_llm(self) -> LLM:
+        """LLM built from the global llm_* settings"""
+        return self._build_llm(
+            self.settings.llm_model, self.settings.llm_temperature, self.settings.llm_max_tokens
+        )
+
+    def for_agent(self, role: str) -> LLM:
+        """LLM routed to the given agent role"""
+        config = self.model_config(role)
+        return self._build_llm(config["model"], config["temperature"], config["max_tokens"])
+
+    def fallback_llm(self) -> LLM:
+        """Larger LLM used when a routed model fails structured-output validation"""
+        return self._build_llm(
+            self.settings.llm_fallback_model, self.settings.llm_temperature, self.settings.llm_max_tokens
+        )
+
+    def escalate(self, role: str, current_llm: Any) -> Any:
+        """Return the fallback LLM for a role unless it is already in use"""
+        fallback = self.fallback_llm()
+        if getattr(current_llm, "model", None) == fallback.model:
+            return current_llm
+
+        with self._lock:
+            self.escalations[role] += 1
+        # The router is shared by every job; each job also counts its own escalations
+        job = current_job()
+        if job:
+            job.count_metric("llm_escalations", role)
+        return fallback
+
+    def converter_for(self, role: str) -> Type[Converter]:
+        """Converter class for a task's converter_cls that repairs output locally, then converts with the fallback LLM"""
+        router = self
+
+        class RoutedConverter(Converter):
+            """Repair structured output locally, or re-run the conversion on the fallback model"""
+
+            def repair(self):
+                repaired = repair_output(self.text, self.model)
+                if repaired is not None:
+                    job = current_job()
+                    if job:
+                        job.count_metric("llm_round_trips_saved", role)
+                return repaired
+
+            def to_pydantic(self, current_attempt=1):
+                if current_attempt == 1:
+                    repaired = self.repair()
+                    if repaired is not None:
+                        return repaired
+                self.llm = router.escalate(role, self.llm)
+                return super().to_pydantic(current_attempt)
+
+            def to_json(self, current_attempt=1):
+                if current_attempt == 1:
+                    repaired = self.repair()
+                    if repaired is not None:
+                        return repaired.model_dump_json()
+                self.llm = router.escalate(role, self.llm)
+                return super().to_json(current_attempt)
+
+        RoutedConverter.__name__ = f"{role.title()}RoutedConverter"
+        return RoutedConverter
@@ -0,0 +1,139 @@
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+import atexit
+import copy
+import itertools
+import json
+import logging
+import queue
+import sys
+import threading
+
+from helpers import tracing
+from helpers.job_context import current_job
+
+LOG_FORMATS = ("json", "text")
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# Third-party loggers that are chatty at INFO
+QUIET_LOGGERS = ("httpx", "httpcore", "LiteLLM", "litellm", "chromadb", "urllib3")
+
+# Limits for PayloadLogger, set from Settings by setup_logging
+PAYLOAD_SETTINGS: Dict[str, int] = {"max_chars": 2000, "sample_every": 10}
+
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+class JobContextFilter(logging.Filter):
+    """Stamp records with the job and span they were logged from"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Runs in the thread that logs, where the job's ContextVars are visible
+        job = current_job()
+        if job is not None and not hasattr(record, "job_id"):
+            record.job_id = job.job_id
+        span = tracing.current_span()
+        if getattr(span, "span_id", None):
+            record.trace_id = span.tracer.trace_id
+            record.span_id = span.span_id
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the message, level, logger and any `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Plain one-line format for local development"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        exception = getattr(record, "exception", None)
+        return f"{text}\n{exception}" if exception else text
+
+class JobQueueHandler(QueueHandler):
+    """QueueHandler that keeps tracebacks as a field instead of folding them into the message"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exception = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+def truncate(value: Any, max_chars: int) -> Any:
+    """Shorten a payload for logging, keeping its head and how much was cut"""
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
+    if len(text) <= max_chars:
+        return value
+    return text[:max_chars] + f"... (+{len(text) - max_chars} chars)"
+
+class PayloadLogger:
+    """Log tool outputs at DEBUG, truncated, and only a sample of the large ones in full"""
+
+    def __init__(self, logger: logging.Logger, max_chars: Optional[int] = None, sample_every: Optional[int] = None):
+        self.logger = logger
+        self.max_chars = max_chars
+        self.sample_every = sample_every
+        self._counter = itertools.count()
+
+    def log(self, message: str, payload: Any, **fields: Any):
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        max_chars = self.max_chars or PAYLOAD_SETTINGS["max_chars"]
+        sample_every = max(1, self.sample_every or PAYLOAD_SETTINGS["sample_every"])
+
+        size = len(payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str))
+        fields["payload_chars"] = size
+        if size <= max_chars or next(self._counter) % sample_every == 0:
+            fields["payload"] = truncate(payload, max_chars)
+        self.logger.debug(message, extra=fields)
+
+def setup_logging(level: str = "INFO", log_format: str = "json", payload_max_chars: int = 2000,
+                  payload_sample_every: int = 10) -> None:
+    """Route all logging through a queue to a single stderr writer thread; safe to call more than once"""
+    global _listener
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Invalid log_format: {log_format}")
+
+    with _lock:
+        root = logging.getLogger()
+        root.setLevel((level or "INFO").upper())
+        for name in QUIET_LOGGERS:
+            logging.getLogger(name).setLevel(max(root.level, logging.WARNING))
+        PAYLOAD_SETTINGS.update(max_chars=payload_max_chars, sample_every=payload_sample_every)
+        if _listener is not None:
+            return
+
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+
+        # Callers only enqueue records; formatting and writing happen on the listener thread
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        queue_handler = JobQueueHandler(log_queue)
+        queue_handler.addFilter(JobContextFilter())
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
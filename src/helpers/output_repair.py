@@ -0,0 +1,218 @@
+from typing import Any, List, Optional, Tuple, Type, Union, get_args, get_origin
+import ast
+import json
+import re
+
+from pydantic import BaseModel, ValidationError
+
+from helpers.price_refresh import parse_price
+
+FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+NULL_STRINGS = {"", "null", "none", "n/a", "na", "-"}
+
+_MISSING = object()
+
+def _json_span(text: str) -> str:
+    """Text from the first opening bracket to the end; trailing prose is left to raw_decode"""
+    fenced = FENCE_RE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    starts = [index for index in (text.find("{"), text.find("[")) if index != -1]
+    if not starts:
+        raise ValueError("No JSON value found")
+    return text[min(starts):]
+
+class _Container:
+    """Open object or array, and where its last complete member ends"""
+
+    def __init__(self, kind: str, start: int):
+        self.kind = kind
+        self.last_good = start + 1
+        self.expects_value = kind == "["
+
+def _close_truncated(text: str) -> Optional[str]:
+    """Close a truncated document after its last complete values, dropping only what was cut off
+
+    A trailing partial token (unfinished string or key, number or literal, dangling ':' or ',') is
+    dropped. Records inside arrays are dropped whole if they are incomplete, so no record loses
+    fields. Returns None if the document is not truncated or not bracket-balanced.
+    """
+    stack: List[_Container] = []
+    index, length = 0, len(text)
+    while index < length:
+        char = text[index]
+        if char.isspace():
+            index += 1
+            continue
+        if char == '"':
+            end = index + 1
+            while end < length and text[end] != '"':
+                end += 2 if text[end] == "\\" else 1
+            if end >= length:
+                break  # unfinished string
+            end += 1
+            if stack and stack[-1].expects_value:
+                stack[-1].last_good = end
+                stack[-1].expects_value = False
+            index = end
+            continue
+        if char in "{[":
+            stack.append(_Container(char, index))
+        elif char in "}]":
+            if not stack or (stack[-1].kind == "{") != (char == "}"):
+                return None
+            stack.pop()
+            if not stack:
+                return None  # complete document
+            stack[-1].last_good = index + 1
+            stack[-1].expects_value = False
+        elif char == ":":
+            if stack:
+                stack[-1].expects_value = True
+        elif char == ",":
+            if stack and stack[-1].kind == "[":
+                stack[-1].expects_value = True
+        else:
+            end = index
+            while end < length and not text[end].isspace() and text[end] not in '{}[]:,"':
+                end += 1
+            if end >= length:
+                break  # a number or literal may have been cut short
+            if stack and stack[-1].expects_value:
+                stack[-1].last_good = end
+                stack[-1].expects_value = False
+            index = end
+            continue
+        index += 1
+
+    if not stack:
+        return None
+    # Cut the outermost open array after its last complete element, which drops any partial record
+    # inside it whole; without an array, cut the innermost object after its last complete field
+    depth = next((depth for depth, container in enumerate(stack) if container.kind == "["), len(stack) - 1)
+    closers = "".join("}" if container.kind == "{" else "]" for container in reversed(stack[:depth + 1]))
+    return text[:stack[depth].last_good] + closers
+
+def _decode(text: str) -> Any:
+    """First JSON value in the text, ignoring anything after it"""
+    return json.JSONDecoder(strict=False).raw_decode(text)[0]
+
+def parse_lenient(text: str) -> Any:
+    """Parse model output that is almost JSON: fenced, wrapped in prose, trailing commas, Python literals or truncated"""
+    span = _json_span(text)
+    attempts = [span, TRAILING_COMMA_RE.sub(r"\1", span)]
+    closed = _close_truncated(attempts[-1])
+    if closed:
+        attempts.append(closed)
+
+    for attempt in attempts:
+        try:
+            return _decode(attempt)
+        except json.JSONDecodeError:
+            pass
+    end = max(span.rfind("}"), span.rfind("]"))
+    try:
+        # Single-quoted keys, True/False/None
+        return ast.literal_eval(span[:end + 1])
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        raise ValueError("Output is not recoverable as JSON")
+
+def _is_null(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and value.strip().lower() in NULL_STRINGS)
+
+def _is_model(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+def _list_bounds(field_info) -> Tuple[Optional[int], Optional[int]]:
+    min_length = max_length = None
+    for constraint in field_info.metadata:
+        min_length = getattr(constraint, "min_length", min_length)
+        max_length = getattr(constraint, "max_length", max_length)
+    return min_length, max_length
+
+def _filler(item_type: Any) -> Any:
+    """Item that can pad a list without inventing content, if the item type has one"""
+    if get_origin(item_type) is Union and type(None) in get_args(item_type):
+        return None
+    if _is_model(item_type) and not any(field.is_required() for field in item_type.model_fields.values()):
+        return {}
+    return _MISSING
+
+def coerce(value: Any, annotation: Any) -> Any:
+    """Best-effort conversion of a parsed value towards a field annotation"""
+    origin = get_origin(annotation)
+    if origin is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if _is_null(value) and len(args) < len(get_args(annotation)):
+            return None
+        return coerce(value, args[0]) if len(args) == 1 else value
+
+    if origin in (list, List):
+        if value is None:
+            return value
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+        item_type = (get_args(annotation) or (Any,))[0]
+        return [coerce(item, item_type) for item in value]
+
+    if _is_model(annotation):
+        return coerce_model(value, annotation) if isinstance(value, dict) else value
+
+    if isinstance(value, bool):
+        return value
+    if annotation is float and isinstance(value, str):
+        price = parse_price(value)
+        return value if price is None else price
+    if annotation is int and isinstance(value, (str, float)):
+        number = parse_price(value)
+        return value if number is None else int(round(number))
+    if annotation is str and isinstance(value, (int, float)):
+        return str(value)
+    return value
+
+def coerce_model(data: dict, model: Type[BaseModel]) -> dict:
+    """Coerce the fields of a model, fill documented defaults and fit lists to their bounds"""
+    repaired = {}
+    for name, field in model.model_fields.items():
+        value = data.get(name, _MISSING)
+        if value is _MISSING and field.alias:
+            value = data.get(field.alias, _MISSING)
+        if value is _MISSING:
+            continue
+        if _is_null(value) and not field.is_required():
+            # e.g. product_original_price: "Set to None if no discount"
+            continue
+
+        value = coerce(value, field.annotation)
+        if isinstance(value, list):
+            min_length, max_length = _list_bounds(field)
+            if max_length is not None:
+                value = value[:max_length]
+            if min_length is not None and len(value) < min_length:
+                filler = _filler((get_args(field.annotation) or (Any,))[0])
+                if filler is not _MISSING:
+                    value = value + [filler] * (min_length - len(value))
+        repaired[name] = value
+    return repaired
+
+def repair_output(text: str, model: Type[BaseModel]) -> Optional[BaseModel]:
+    """Validate model output locally, returning None when only another LLM call can fix it"""
+    try:
+        data = parse_lenient(text)
+    except ValueError:
+        return None
+
+    if isinstance(data, list):
+        # A bare list for a schema with a single list field, e.g. [...] for {"queries": [...]}
+        list_fields = [name for name, field in model.model_fields.items() if get_origin(field.annotation) in (list, List)]
+        if len(list_fields) != 1:
+            return None
+        data = {list_fields[0]: data}
+    if not isinstance(data, dict):
+        return None
+
+    try:
+        return model.model_validate(coerce_model(data, model))
+    except ValidationError:
+        return None
@@ -0,0 +1,81 @@
+from html import escape
+from typing import Any, Dict, List
+
+def _format_price(value: Any) -> str:
+    if value is None or value == "":
+        return "-"
+    return escape(str(value))
+
+def _product_rows(products: List[Dict[str, Any]]) -> str:
+    rows = []
+    for product in products:
+        specs = ", ".join(
+            f"{escape(str(spec.get('specification_name', '')))}: {escape(str(spec.get('specification_value', '')))}"
+            for spec in product.get("product_specs") or []
+        )
+        url = escape(str(product.get("product_url") or product.get("page_url") or ""))
+        rows.append(
+            "<tr>"
+            f"<td><a href=\"{url}\" target=\"_blank\">{escape(str(product.get('product_title', url)))}</a></td>"
+            f"<td>{_format_price(product.get('product_current_price'))}</td>"
+            f"<td>{_format_price(product.get('product_original_price'))}</td>"
+            f"<td>{_format_price(product.get('product_discount_percentage'))}</td>"
+            f"<td>{specs or '-'}</td>"
+            "</tr>"
+        )
+    return "\n".join(rows)
+
+def _page_rows(pages: List[Dict[str, Any]]) -> str:
+    rows = []
+    for page in pages:
+        url = escape(str(page.get("page_url", "")))
+        details = page.get("details")
+        if isinstance(details, dict):
+            details = details.get("result", details)
+        rows.append(
+            "<tr>"
+            f"<td><a href=\"{url}\" target=\"_blank\">{url}</a></td>"
+            f"<td><pre class=\"mb-0 small\">{escape(str(details))}</pre></td>"
+            "</tr>"
+        )
+    return "\n".join(rows)
+
+def render_partial_report(inputs: Dict[str, Any], products: List[Dict[str, Any]],
+                          pages: List[Dict[str, Any]], deadline_seconds: float) -> str:
+    """Render a Bootstrap report from whatever was extracted before the deadline"""
+    if products:
+        table = f"""
+        <table class="table table-striped">
+            <thead><tr><th>Product</th><th>Current price</th><th>Original price</th><th>Discount %</th><th>Specs</th></tr></thead>
+            <tbody>{_product_rows(products)}</tbody>
+        </table>"""
+    elif pages:
+        table = f"""
+        <table class="table table-striped">
+            <thead><tr><th>Page</th><th>Extracted details</th></tr></thead>
+            <tbody>{_page_rows(pages)}</tbody>
+        </table>"""
+    else:
+        table = "<p>No products were extracted before the deadline.</p>"
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>Partial Procurement Report - {escape(str(inputs.get("product_name", "")))}</title>
+    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
+</head>
+<body>
+    <div class="container mt-5" data-report-status="partial">
+        <div class="alert alert-warning">
+            <strong>Partial report.</strong> The {deadline_seconds:g}s deadline was reached before the research
+            finished; the products below are the ones extracted so far.
+        </div>
+        <h1>Procurement Report: {escape(str(inputs.get("product_name", "")))}</h1>
+        <p class="text-muted">Country: {escape(str(inputs.get("country_name", "")))} &middot;
+            Websites: {escape(", ".join(inputs.get("websites_list") or []))}</p>
+        {table}
+    </div>
+</body>
+</html>
+"""
@@ -0,0 +1,300 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from html import escape
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import re
+import shutil
+
+PRICE_FIELDS = ["product_current_price", "product_original_price", "product_discount_percentage"]
+PRODUCTS_FILENAME = "step_3_search_results.json"
+REPORT_FILENAME = "step_4_procurement_report.html"
+
+SECTION_START = "<!-- price-refresh:start -->"
+SECTION_END = "<!-- price-refresh:end -->"
+
+NUMBER_RE = re.compile(r"-?\d[\d\s.,]*")
+
+# A price or percentage written in report text, e.g. "1,299.00", "1 299,00", "1299" or "15"
+REPORT_NUMBER_RE = re.compile(r"\d{1,3}(?:[ \u00a0,.]\d{3})+(?:[.,]\d{1,2})?(?!\d)|\d+(?:[.,]\d{1,2})?(?!\d)")
+
+# Elements re-rendered when they mention a product whose price changed
+BLOCK_TAGS = {"tr", "li", "p", "div", "section", "article"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+def parse_price(value: Any) -> Optional[float]:
+    """Read a price such as 1299, "1 299,00 MAD" or "$1,299.99" as a float"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    match = NUMBER_RE.search(str(value))
+    if not match:
+        return None
+    number = match.group(0).replace(" ", "").replace("\u00a0", "").rstrip(".,")
+
+    # The last separator followed by one or two digits is the decimal mark
+    last_sep = max(number.rfind(","), number.rfind("."))
+    if last_sep != -1 and len(number) - last_sep - 1 in (1, 2):
+        integer, decimals = number[:last_sep], number[last_sep + 1:]
+        number = integer.replace(",", "").replace(".", "") + "." + decimals
+    else:
+        number = number.replace(",", "").replace(".", "")
+
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+def load_products(directory: str) -> List[Dict[str, Any]]:
+    """Products extracted by a previous job"""
+    with open(os.path.join(directory, PRODUCTS_FILENAME), encoding="utf-8") as f:
+        return json.load(f).get("products", [])
+
+def scrape_price(scrape_client: Any, product: Dict[str, Any]) -> Dict[str, Any]:
+    """Re-scrape only the price and discount fields of one product page"""
+    url = product.get("product_url") or product.get("page_url")
+    try:
+        response = scrape_client.smartscraper(
+            website_url=url,
+            user_prompt="Extract " + json.dumps(PRICE_FIELDS) + " from the web page."
+        )
+    except Exception as e:
+        return {"url": url, "error": str(e)}
+
+    details = response.get("result", response) if isinstance(response, dict) else {}
+    if not isinstance(details, dict):
+        return {"url": url, "error": "Unexpected scrape response"}
+    return {"url": url, **{field: parse_price(details.get(field)) for field in PRICE_FIELDS}}
+
+def _changed(old: Optional[float], new: Optional[float]) -> bool:
+    if old is None or new is None:
+        return old != new
+    return abs(old - new) > 0.005
+
+def diff_prices(products: List[Dict[str, Any]], scraped: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Apply fresh prices to products in place and return the ones that changed"""
+    changes = []
+    for product, fresh in zip(products, scraped):
+        if "error" in fresh or fresh.get("product_current_price") is None:
+            continue
+        fields = {
+            field: (product.get(field), fresh[field])
+            for field in PRICE_FIELDS
+            if _changed(parse_price(product.get(field)), fresh[field])
+        }
+        if fields:
+            changes.append({"product_title": product.get("product_title"), "url": fresh["url"], "fields": fields})
+            for field, (_, new) in fields.items():
+                product[field] = new
+    return changes
+
+def render_price_section(changes: List[Dict[str, Any]], failed: int, refreshed_at: datetime) -> str:
+    """Bootstrap section listing only the products whose prices changed"""
+    rows = []
+    for change in changes:
+        old_price, new_price = change["fields"].get("product_current_price", (None, None))
+        discount = change["fields"].get("product_discount_percentage", (None, None))[1]
+        rows.append(
+            "<tr>"
+            f"<td><a href=\"{escape(change['url'] or '')}\" target=\"_blank\">{escape(str(change['product_title']))}</a></td>"
+            f"<td>{'-' if old_price is None else escape(str(old_price))}</td>"
+            f"<td>{'-' if new_price is None else escape(str(new_price))}</td>"
+            f"<td>{'-' if discount is None else escape(str(discount))}</td>"
+            "</tr>"
+        )
+
+    body = (
+        "<table class=\"table table-sm table-striped\">"
+        "<thead><tr><th>Product</th><th>Previous price</th><th>Current price</th><th>Discount %</th></tr></thead>"
+        f"<tbody>{''.join(rows)}</tbody></table>"
+        if rows else "<p>No price changes since the last check.</p>"
+    )
+    note = f"<p class=\"text-muted small\">{failed} product page(s) could not be refreshed.</p>" if failed else ""
+
+    return (
+        f"{SECTION_START}\n"
+        "<div class=\"container my-4\" id=\"price-refresh\">"
+        f"<h2>Price Update ({refreshed_at.strftime('%Y-%m-%d %H:%M')})</h2>"
+        f"{body}{note}</div>\n"
+        f"{SECTION_END}"
+    )
+
+class _ReportLayout(HTMLParser):
+    """Offsets of the block elements and text runs of a report"""
+
+    def __init__(self, html: str):
+        super().__init__(convert_charrefs=False)
+        self._html = html
+        # getpos() counts lines by "\n" only
+        self._line_starts = [0]
+        for line in html.split("\n"):
+            self._line_starts.append(self._line_starts[-1] + len(line) + 1)
+        self._open: List[Tuple[str, int]] = []
+        self.blocks: List[Tuple[int, int]] = []
+        self.texts: List[Tuple[int, int]] = []
+        self.feed(html)
+        self.close()
+        for tag, start in self._open:
+            if tag in BLOCK_TAGS:
+                self.blocks.append((start, len(html)))
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self._line_starts[line - 1] + column
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in VOID_TAGS:
+            self._open.append((tag, self._offset()))
+
+    def handle_endtag(self, tag):
+        if not any(open_tag == tag for open_tag, _ in self._open):
+            return
+        end = self._html.find(">", self._offset()) + 1
+        # Elements left open inside this one (e.g. an unclosed <p>) end with it
+        while self._open:
+            open_tag, start = self._open.pop()
+            if open_tag in BLOCK_TAGS:
+                self.blocks.append((start, end))
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        start = self._offset()
+        self.texts.append((start, start + len(data)))
+
+    def innermost_block(self, offset: int) -> Optional[Tuple[int, int]]:
+        containing = [block for block in self.blocks if block[0] <= offset < block[1]]
+        return min(containing, key=lambda block: block[1] - block[0]) if containing else None
+
+def format_like(token: str, value: float) -> str:
+    """Write `value` with the thousands separator, decimal mark and decimals of a number in the report"""
+    decimal_mark, decimals = "", 0
+    last_sep = max(token.rfind(","), token.rfind("."))
+    if last_sep != -1 and len(token) - last_sep - 1 in (1, 2):
+        decimal_mark, decimals = token[last_sep], len(token) - last_sep - 1
+    grouping = re.search(r"\d([ \u00a0,.])\d{3}(?:[ \u00a0,.]|$)", token[:last_sep] if decimal_mark else token)
+    thousands = grouping.group(1) if grouping else ""
+    if not decimals and abs(value - round(value)) >= 0.005:
+        decimal_mark, decimals = decimal_mark or ("," if thousands == "." else "."), 2
+
+    text = f"{abs(value):,.{decimals}f}"
+    integer, _, fraction = text.partition(".")
+    integer = integer.replace(",", thousands)
+    return ("-" if value < 0 else "") + integer + (decimal_mark + fraction if decimals else "")
+
+def _price_edits(html: str, layout: _ReportLayout, change: Dict[str, Any],
+                 product: Dict[str, Any]) -> Dict[Tuple[int, int], str]:
+    """Replacements of the old prices of one product inside the report blocks that mention it"""
+    title, url = str(change.get("product_title") or ""), change.get("url") or ""
+    titles = {title, escape(title)} - {""}
+    mentions = [
+        match.start() for needle in titles | ({url, escape(url)} - {""})
+        for match in re.finditer(re.escape(needle), html)
+    ]
+    blocks = {layout.innermost_block(offset) for offset in mentions} - {None}
+
+    # Old values in field order; a value shared by several fields is replaced in that order
+    replacements: Dict[Tuple[bool, float], List[float]] = {}
+    for field in PRICE_FIELDS:
+        old, new = change["fields"].get(field, (product.get(field), product.get(field)))
+        old, new = parse_price(old), parse_price(new)
+        if old is not None and new is not None:
+            replacements.setdefault((field == "product_discount_percentage", round(old, 2)), []).append(new)
+
+    edits = {}
+    for block_start, block_end in sorted(blocks):
+        queues = {key: list(news) for key, news in replacements.items()}
+        # Numbers in the product title, e.g. "Laptop 15", are not prices
+        in_title = [
+            match.span() for needle in titles
+            for match in re.compile(re.escape(needle)).finditer(html, block_start, block_end)
+        ]
+        for text_start, text_end in layout.texts:
+            if text_start < block_start or text_end > block_end:
+                continue
+            for match in REPORT_NUMBER_RE.finditer(html, text_start, text_end):
+                start, end = match.span()
+                if any(title_start <= start < title_end for title_start, title_end in in_title):
+                    continue
+                percent = html[end:text_end].lstrip().startswith("%")
+                queue = queues.get((percent, round(parse_price(match.group(0)), 2)))
+                if not queue:
+                    continue
+                text = format_like(match.group(0), queue.pop(0) if len(queue) > 1 else queue[0])
+                if text != match.group(0):
+                    edits.setdefault((start, end), text)
+    return edits
+
+def rerender_prices(html: str, changes: List[Dict[str, Any]], products: List[Dict[str, Any]]) -> Tuple[str, int]:
+    """Rewrite the old prices in the report rows, list items and paragraphs of products whose price changed"""
+    layout = _ReportLayout(html)
+    by_url = {product.get("product_url") or product.get("page_url"): product for product in products}
+    edits: Dict[Tuple[int, int], str] = {}
+    for change in changes:
+        for span, text in _price_edits(html, layout, change, by_url.get(change["url"], {})).items():
+            edits.setdefault(span, text)
+
+    for (start, end), text in sorted(edits.items(), reverse=True):
+        html = html[:start] + text + html[end:]
+    return html, len(edits)
+
+def update_report(report_path: str, section: str, changes: Optional[List[Dict[str, Any]]] = None,
+                  products: Optional[List[Dict[str, Any]]] = None) -> int:
+    """Re-render the changed prices in a report and replace its price-update section, or append one;
+    returns the number of prices rewritten"""
+    with open(report_path, encoding="utf-8") as f:
+        html = f.read()
+
+    # Empty the previous price-update section so that only the report body is re-rendered
+    start, end = html.find(SECTION_START), html.find(SECTION_END)
+    if start != -1 and end != -1:
+        html = html[:start] + SECTION_START + SECTION_END + html[end + len(SECTION_END):]
+
+    html, rewritten = rerender_prices(html, changes or [], products or [])
+    if SECTION_START + SECTION_END in html:
+        html = html.replace(SECTION_START + SECTION_END, section, 1)
+    elif "</body>" in html:
+        index = html.rfind("</body>")
+        html = html[:index] + section + "\n" + html[index:]
+    else:
+        html += "\n" + section
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(html)
+    return rewritten
+
+def refresh_prices(scrape_client: Any, source_dir: str, output_dir: str, max_workers: int = 8) -> Dict[str, Any]:
+    """Re-scrape the prices of a previous job's products into a new output directory"""
+    products = load_products(source_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(products) or 1))) as pool:
+        scraped = list(pool.map(lambda product: scrape_price(scrape_client, product), products))
+
+    changes = diff_prices(products, scraped)
+    failed = sum(1 for result in scraped if "error" in result)
+    refreshed_at = datetime.now()
+
+    with open(os.path.join(output_dir, PRODUCTS_FILENAME), "w", encoding="utf-8") as f:
+        json.dump({"products": products}, f, ensure_ascii=False, indent=2)
+
+    rewritten = 0
+    source_report = os.path.join(source_dir, REPORT_FILENAME)
+    if os.path.exists(source_report):
+        report_path = os.path.join(output_dir, REPORT_FILENAME)
+        if os.path.abspath(source_report) != os.path.abspath(report_path):
+            shutil.copyfile(source_report, report_path)
+        rewritten = update_report(report_path, render_price_section(changes, failed, refreshed_at), changes, products)
+
+    return {
+        "products": len(products),
+        "changed": len(changes),
+        "failed": failed,
+        "changes": changes,
+        "report_prices_rewritten": rewritten,
+        "refreshed_at": refreshed_at.isoformat()
+    }
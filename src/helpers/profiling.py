@@ -0,0 +1,77 @@
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+import cProfile
+import logging
+import pstats
+import sys
+import threading
+import time
+
+PROFILE_FILENAME = "profile.pstats"
+PROFILE_SUMMARY_FILENAME = "profile.txt"
+
+logger = logging.getLogger(__name__)
+
+# Python 3.12+ allows a single cProfile per process, so jobs are profiled one at a time
+_profile_lock = threading.Lock()
+
+@contextmanager
+def profile_job(output_dir: str, top: int = 50) -> Iterator[Optional[cProfile.Profile]]:
+    """cProfile the calling thread, saving the stats and a cumulative-time summary in the job directory"""
+    if not _profile_lock.acquire(blocking=False):
+        logger.warning("Another job is being profiled; not profiling this one")
+        yield None
+        return
+
+    profile = cProfile.Profile()
+    try:
+        try:
+            profile.enable()
+        except ValueError:
+            logger.warning("Another profiler is active; not profiling this job")
+            yield None
+            return
+        try:
+            yield profile
+        finally:
+            profile.disable()
+            directory = Path(output_dir)
+            directory.mkdir(parents=True, exist_ok=True)
+            profile.dump_stats(str(directory / PROFILE_FILENAME))
+            with open(directory / PROFILE_SUMMARY_FILENAME, "w", encoding="utf-8") as f:
+                pstats.Stats(profile, stream=f).sort_stats("cumulative").print_stats(top)
+    finally:
+        _profile_lock.release()
+
+def frame_stack(frame) -> List[str]:
+    """Functions on a frame's stack as module:function, outermost first"""
+    stack = []
+    while frame is not None:
+        module = frame.f_globals.get("__name__") or Path(frame.f_code.co_filename).stem
+        stack.append(f"{module}:{frame.f_code.co_name}".replace(";", ":"))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+def sample_stacks(seconds: float, interval: float = 0.01) -> Counter:
+    """Sample the stacks of every other thread for `seconds`, counting each distinct stack"""
+    if not interval > 0:
+        raise ValueError("interval must be positive")
+    counts: Counter = Counter()
+    own_thread = threading.get_ident()
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_thread:
+                continue
+            thread_name = names.get(ident, f"thread-{ident}").replace(";", ":")
+            counts[";".join([thread_name, *frame_stack(frame)])] += 1
+        time.sleep(interval)
+    return counts
+
+def format_collapsed(counts: Counter) -> str:
+    """Collapsed stacks ("frame;frame;frame count" lines), as read by flamegraph.pl and speedscope"""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
@@ -0,0 +1,126 @@
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+import re
+import threading
+
+from helpers.reranker import canonical_url, normalize_domain, tokenize
+
+# Shopping words that make queries look different without changing what they find
+INTENT_WORDS = frozenset({
+    "buy", "best", "cheap", "cheapest", "price", "prices", "online", "shop", "store", "sale",
+    "deal", "deals", "discount", "offer", "offers", "order", "for", "in", "the", "of", "with",
+})
+
+SITE_RE = re.compile(r"\s*\bsite:(\S+)\s*", re.IGNORECASE)
+
+COVERAGE_MESSAGE = "Recent searches found no new pages. Stop searching and return the results collected so far."
+
+def shingles(query: str, size: int = 2) -> FrozenSet[str]:
+    """Words and word n-grams of a query, ignoring intent words and word order"""
+    tokens = sorted(set(token for token in tokenize(query) if token not in INTENT_WORDS))
+    grams = set(tokens)
+    for start in range(len(tokens) - size + 1):
+        grams.add(" ".join(tokens[start:start + size]))
+    return frozenset(grams)
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+def dedupe_queries(queries: Iterable[str], threshold: float = 0.6) -> Tuple[List[str], List[str]]:
+    """Split queries into the ones to keep and near-duplicates of an earlier kept query"""
+    kept, dropped = [], []
+    kept_shingles: List[FrozenSet[str]] = []
+    for query in queries:
+        query = " ".join(query.split())
+        if not query:
+            continue
+        current = shingles(query)
+        if any(jaccard(current, other) >= threshold for other in kept_shingles):
+            dropped.append(query)
+            continue
+        kept.append(query)
+        kept_shingles.append(current)
+    return kept, dropped
+
+def split_site(query: str) -> Tuple[str, Optional[str]]:
+    """Query without its site: operator, and the domain it was restricted to"""
+    match = SITE_RE.search(query)
+    if not match:
+        return query, None
+    return SITE_RE.sub(" ", query).strip(), normalize_domain(match.group(1))
+
+def unique_domains(websites: Iterable[str]) -> List[str]:
+    """Normalized target domains, without duplicates"""
+    return list(dict.fromkeys(domain for domain in map(normalize_domain, websites) if domain))
+
+def expand_queries(queries: List[str], domains: Iterable[str], max_queries: Optional[int] = None) -> List[str]:
+    """Site-restricted copies of each query for every target domain"""
+    domains = unique_domains(domains)
+    if not domains:
+        planned = list(queries)
+    else:
+        # Each round gives every query one more domain, rotated so a cut-off plan still covers all
+        # queries and spreads them over the domains
+        planned = [
+            f"{query} site:{domains[(index + round_no) % len(domains)]}"
+            for round_no in range(len(domains))
+            for index, query in enumerate(queries)
+        ]
+    return planned[:max_queries] if max_queries else planned
+
+class QueryPlan:
+    """Queries the search agent is given, after pruning near-duplicates and expanding per domain"""
+
+    def __init__(self, generated: List[str], websites_list: Iterable[str], max_queries: Optional[int] = None,
+                 threshold: float = 0.6, expand_domains: bool = True):
+        self.generated = list(generated)
+        self.kept, self.dropped = dedupe_queries(self.generated, threshold)
+        self.queries = expand_queries(self.kept, websites_list if expand_domains else (), max_queries)
+        # Without planning, the search agent searched each generated query once
+        self.baseline_searches = len(self.generated)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "generated": len(self.generated),
+            "duplicates": len(self.dropped),
+            "planned": len(self.queries),
+            "baseline_searches": self.baseline_searches
+        }
+
+class SearchCoverage:
+    """Tracks the canonical URLs searches return, and stops searching once they stop finding new ones"""
+
+    def __init__(self, patience: int = 3):
+        self.patience = patience
+        self.seen: Set[str] = set()
+        self.searches = 0
+        self.stale_streak = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.patience > 0 and self.stale_streak >= self.patience
+
+    def should_stop(self) -> bool:
+        """Whether to skip the next search, counting it as saved if so"""
+        with self._lock:
+            if self.exhausted:
+                self.skipped += 1
+                return True
+            return False
+
+    def observe(self, response: Any) -> int:
+        """Record a search response and return how many new canonical URLs it found"""
+        results = (response.get("results") or []) if isinstance(response, dict) else []
+        urls = {canonical_url(result.get("url", "")) for result in results if result.get("url")}
+        with self._lock:
+            new = urls - self.seen
+            self.seen |= new
+            self.searches += 1
+            self.stale_streak = 0 if new else self.stale_streak + 1
+        return len(new)
+
+    def stats(self) -> Dict[str, int]:
+        return {"searches": self.searches, "unique_urls": len(self.seen), "skipped": self.skipped}
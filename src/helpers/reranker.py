@@ -0,0 +1,115 @@
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+import math
+import re
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Weights of the combined ranking score
+BM25_WEIGHT = 0.6
+SEARCH_SCORE_WEIGHT = 0.25
+DOMAIN_WEIGHT = 0.15
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens, ignoring single characters"""
+    return [token for token in TOKEN_RE.findall((text or "").lower()) if len(token) > 1]
+
+def canonical_url(url: str) -> str:
+    """URL without scheme, www, query string, fragment or trailing slash"""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host + parts.path.rstrip("/")
+
+def normalize_domain(value: str) -> str:
+    """Lowercased host of a URL or bare domain, without www"""
+    value = value.strip().lower()
+    host = urlsplit(value if "//" in value else "//" + value).netloc
+    return host[4:] if host.startswith("www.") else host
+
+def matches_domain(url: str, domains: Iterable[str]) -> bool:
+    host = normalize_domain(url)
+    return any(host == domain or host.endswith("." + domain) for domain in domains if domain)
+
+class BM25Index:
+    """In-memory Okapi BM25 index over a small set of documents"""
+
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(tokenize(document)) for document in documents]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+        document_frequency = Counter()
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    def scores(self, query_terms: Dict[str, float]) -> List[float]:
+        """BM25 score of every document for weighted query terms"""
+        results = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_length) if self.avg_length else self.k1
+            score = 0.0
+            for term, weight in query_terms.items():
+                tf = counts.get(term)
+                if tf:
+                    score += weight * self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+def build_query_terms(product_name: str, spec_terms: Iterable[str] = ()) -> Dict[str, float]:
+    """Product-name terms weigh more than terms taken from specs or generated queries"""
+    terms: Dict[str, float] = {}
+    for term in tokenize(" ".join(spec_terms)):
+        terms[term] = terms.get(term, 0.0) + 0.25
+    for term in tokenize(product_name):
+        terms[term] = terms.get(term, 0.0) + 1.0
+    return terms
+
+def rerank_results(results: List[Dict[str, Any]], product_name: str, spec_terms: Iterable[str] = (),
+                   target_domains: Iterable[str] = (), top_k: int = 10,
+                   score_th: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Pick the top-K distinct result pages to scrape, without an LLM"""
+    # Keep the best-scored copy of each page
+    unique: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        key = canonical_url(result.get("url", ""))
+        if not key:
+            continue
+        if key not in unique or (result.get("score") or 0) > (unique[key].get("score") or 0):
+            unique[key] = result
+
+    candidates = list(unique.values())
+    if score_th is not None:
+        candidates = [result for result in candidates if (result.get("score") or 0) >= score_th]
+    if not candidates:
+        return []
+
+    # Titles count twice so a matching product title beats a passing mention
+    index = BM25Index([
+        f"{result.get('title', '')} {result.get('title', '')} {result.get('content', '')}"
+        for result in candidates
+    ])
+    bm25 = index.scores(build_query_terms(product_name, spec_terms))
+    top_bm25 = max(bm25) or 1.0
+    domains = [normalize_domain(domain) for domain in target_domains]
+
+    ranked = []
+    for result, lexical in zip(candidates, bm25):
+        combined = (
+            BM25_WEIGHT * lexical / top_bm25
+            + SEARCH_SCORE_WEIGHT * float(result.get("score") or 0)
+            + DOMAIN_WEIGHT * (1.0 if domains and matches_domain(result.get("url", ""), domains) else 0.0)
+        )
+        ranked.append((combined, result))
+
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    return [{**result, "rerank_score": round(score, 4)} for score, result in ranked[:top_k]]
@@ -0,0 +1,73 @@
+from typing import Any, Callable, List, Optional
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Called with the exception when a job function raises
+ErrorHandler = Callable[[Exception], Any]
+
+class DeadlineScheduler:
+    """Fixed pool of worker threads that runs queued jobs earliest-deadline-first"""
+
+    def __init__(self, max_workers: int = 2, undated_wait_seconds: float = 600.0):
+        self.undated_wait_seconds = undated_wait_seconds
+        self._queue: List[tuple] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn: Callable, *args: Any, deadline_at: Optional[float] = None,
+               on_error: Optional[ErrorHandler] = None) -> None:
+        """Queue a job; jobs without a deadline are due `undated_wait_seconds` after submission"""
+        priority = time.monotonic() + self.undated_wait_seconds if deadline_at is None else deadline_at
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("Scheduler has been shut down")
+            heapq.heappush(self._queue, (priority, next(self._sequence), fn, args, on_error))
+            self._condition.notify()
+
+    def queued(self) -> int:
+        """Number of jobs waiting for a worker"""
+        with self._condition:
+            return len(self._queue)
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._shutdown:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                _, _, fn, args, on_error = heapq.heappop(self._queue)
+
+            try:
+                fn(*args)
+            except Exception as e:
+                logger.exception("Scheduled job raised", extra={"job_fn": getattr(fn, "__name__", repr(fn))})
+                if on_error is not None:
+                    try:
+                        on_error(e)
+                    except Exception:
+                        logger.exception("Error handler of a scheduled job raised")
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        """Stop accepting jobs, optionally dropping the ones still queued"""
+        with self._condition:
+            self._shutdown = True
+            if cancel_futures:
+                self._queue.clear()
+            self._condition.notify_all()
+
+        if wait:
+            for thread in self._threads:
+                thread.join()
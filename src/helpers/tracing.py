@@ -0,0 +1,373 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+TRACE_FILENAME = "trace.jsonl"
+SERVICE_NAME = "rankx-product-research"
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+CLIENT_KINDS = ("llm", "tool")
+
+# Rough OpenAI tokenizer ratio, used when litellm cannot count tokens for a model
+CHARS_PER_TOKEN = 4
+
+logger = logging.getLogger(__name__)
+
+_current_tracer: ContextVar[Optional["Tracer"]] = ContextVar("current_tracer", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def _plain_value(value: Dict[str, Any]) -> Any:
+    if "boolValue" in value:
+        return value["boolValue"]
+    if "intValue" in value:
+        return int(value["intValue"])
+    if "doubleValue" in value:
+        return value["doubleValue"]
+    return value.get("stringValue")
+
+class Span:
+    """One timed operation of a job"""
+
+    def __init__(self, tracer: "Tracer", name: str, kind: str, parent: Optional["Span"],
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.span_id = _new_id(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Span in the OTLP/JSON encoding"""
+        span = {
+            "traceId": self.tracer.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KIND_CLIENT if self.kind in CLIENT_KINDS else SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in {"rankx.kind": self.kind, **self.attributes}.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+class _NoopSpan:
+    """Stand-in when no trace is active, so callers never need to check"""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class JsonlSpanExporter:
+    """Append finished spans, one OTLP/JSON span per line, to a local file"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, span: Dict[str, Any]):
+        line = json.dumps(span, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+class OtlpHttpExporter:
+    """Send a job's spans to an OTLP/HTTP collector (e.g. http://localhost:4318/v1/traces) when it ends"""
+
+    def __init__(self, endpoint: str, timeout: float = 10.0):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self._spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Dict[str, Any]):
+        with self._lock:
+            self._spans.append(span)
+
+    def close(self):
+        import httpx
+
+        with self._lock:
+            spans, self._spans = self._spans, []
+        if not spans:
+            return
+        try:
+            httpx.post(self.endpoint, json=to_otlp_request(spans), timeout=self.timeout).raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning("Could not export trace", extra={"endpoint": self.endpoint, "error": str(e)})
+
+def to_otlp_request(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """OTLP ExportTraceServiceRequest body for a list of spans"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "rankx.tracing"}, "spans": spans}]
+        }]
+    }
+
+class Tracer:
+    """Collects the spans of one job and hands finished ones to its exporters"""
+
+    def __init__(self, exporters: List[Any]):
+        self.trace_id = _new_id(16)
+        self.exporters = exporters
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes: Any) -> Iterator[Span]:
+        span = Span(self, name, kind, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        record = span.to_otlp()
+        with self._lock:
+            if self._closed:
+                # Spans from a crew abandoned at its deadline end after the job
+                return
+            for exporter in self.exporters:
+                exporter.export(record)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        for exporter in self.exporters:
+            exporter.close()
+
+    @contextmanager
+    def activate(self):
+        """Record spans started in this context into this trace; exporters are closed on exit"""
+        token = _current_tracer.set(self)
+        try:
+            yield self
+        finally:
+            _current_tracer.reset(token)
+            self.close()
+
+def current_span() -> Any:
+    """Innermost active span, or a no-op span outside of a trace"""
+    return _current_span.get() or NOOP_SPAN
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes: Any) -> Iterator[Any]:
+    """Time a block as a child of the current span, when a trace is active"""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield NOOP_SPAN
+        return
+    with tracer.span(name, kind, **attributes) as active:
+        yield active
+
+AttributesFn = Callable[[tuple, Dict[str, Any], Any], Dict[str, Any]]
+
+def install(obj: Any, method_name: str, kind: str, name: str, attributes: Optional[AttributesFn] = None) -> None:
+    """Patch an instance method so each call is recorded as a span of the active trace"""
+    original = getattr(obj, method_name)
+    if getattr(original, "_trace_name", None):
+        return
+
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        with span(name, kind) as active:
+            result = original(*args, **kwargs)
+            if attributes is not None and active is not NOOP_SPAN:
+                for key, value in attributes(args, kwargs, result).items():
+                    active.set_attribute(key, value)
+            return result
+
+    wrapper._trace_name = name
+    # Tasks are pydantic models, which reject assignment to non-field attributes
+    object.__setattr__(obj, method_name, wrapper)
+
+def count_tokens(model: str, messages: Any = None, text: Optional[str] = None) -> int:
+    """Tokens in a prompt or text for a model, estimated from its length if litellm cannot count them"""
+    try:
+        import litellm
+        if text is not None:
+            return litellm.token_counter(model=model, text=text)
+        return litellm.token_counter(model=model, messages=messages)
+    except Exception:
+        size = len(text) if text is not None else len(json.dumps(messages, ensure_ascii=False, default=str))
+        return size // CHARS_PER_TOKEN
+
+def llm_attributes(model: str) -> AttributesFn:
+    """Span attributes of an LLM.call(messages, ...)"""
+    def attributes(args: tuple, kwargs: Dict[str, Any], result: Any) -> Dict[str, Any]:
+        messages = args[0] if args else kwargs.get("messages")
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        return {
+            "llm.model": model,
+            "llm.prompt_tokens": count_tokens(model, messages=messages),
+            "llm.completion_tokens": count_tokens(model, text=result if isinstance(result, str) else str(result))
+        }
+    return attributes
+
+def search_attributes(args: tuple, kwargs: Dict[str, Any], result: Any) -> Dict[str, Any]:
+    """Span attributes of a Tavily search"""
+    return {
+        "search.query": kwargs.get("query", args[0] if args else None),
+        "search.results": len(result.get("results") or []) if isinstance(result, dict) else None
+    }
+
+def scrape_attributes(args: tuple, kwargs: Dict[str, Any], result: Any) -> Dict[str, Any]:
+    """Span attributes of a ScrapeGraph smartscraper call"""
+    return {"scrape.url": kwargs.get("website_url", args[0] if args else None)}
+
+def load_trace(path: str) -> List[Dict[str, Any]]:
+    """Spans of a trace file as plain dicts with millisecond offsets from the trace start"""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+    if not records:
+        return []
+
+    origin = min(int(record["startTimeUnixNano"]) for record in records)
+    spans = []
+    for record in records:
+        attributes = {item["key"]: _plain_value(item["value"]) for item in record.get("attributes", [])}
+        spans.append({
+            "span_id": record["spanId"],
+            "parent_id": record.get("parentSpanId"),
+            "name": record["name"],
+            "kind": attributes.pop("rankx.kind", "internal"),
+            "start_ms": (int(record["startTimeUnixNano"]) - origin) / 1e6,
+            "end_ms": (int(record["endTimeUnixNano"]) - origin) / 1e6,
+            "attributes": attributes,
+            "error": record.get("status", {}).get("message")
+        })
+    return spans
+
+def _children(spans: List[Dict[str, Any]]) -> Dict[Optional[str], List[Dict[str, Any]]]:
+    ids = {span["span_id"] for span in spans}
+    children = defaultdict(list)
+    for span in spans:
+        # Spans whose parent was not exported (e.g. cut off at a deadline) hang off the root
+        children[span["parent_id"] if span["parent_id"] in ids else None].append(span)
+    return children
+
+def _self_ms(span: Dict[str, Any], children: List[Dict[str, Any]]) -> float:
+    """Span time not covered by any child"""
+    covered = 0.0
+    cursor = span["start_ms"]
+    for child in sorted(children, key=lambda child: child["start_ms"]):
+        start = max(child["start_ms"], cursor)
+        end = min(child["end_ms"], span["end_ms"])
+        if end > start:
+            covered += end - start
+            cursor = end
+    return max(0.0, span["end_ms"] - span["start_ms"] - covered)
+
+def critical_path(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Chain of spans that determined the job's wall time, with the time each spent on it alone"""
+    children = _children(spans)
+    path = []
+
+    def walk(span: Dict[str, Any]):
+        # From the end of the span backwards, follow the latest child that finished before the cutoff
+        chosen = []
+        cutoff = span["end_ms"]
+        for child in sorted(children[span["span_id"]], key=lambda child: child["end_ms"], reverse=True):
+            if child["end_ms"] <= cutoff:
+                chosen.append(child)
+                cutoff = child["start_ms"]
+        chosen.reverse()
+        path.append({
+            "name": span["name"],
+            "kind": span["kind"],
+            "start_ms": round(span["start_ms"], 3),
+            "duration_ms": round(span["end_ms"] - span["start_ms"], 3),
+            "self_ms": round(_self_ms(span, chosen), 3)
+        })
+        for child in chosen:
+            walk(child)
+
+    for root in sorted(children[None], key=lambda root: root["start_ms"]):
+        walk(root)
+    return path
+
+def trace_view(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Critical path, self time per span kind and name, and flame-graph collapsed stacks"""
+    children = _children(spans)
+    by_id = {span["span_id"]: span for span in spans}
+    by_kind: Dict[str, float] = defaultdict(float)
+    by_name: Dict[str, float] = defaultdict(float)
+    stacks: Dict[str, float] = defaultdict(float)
+
+    for span in spans:
+        self_ms = _self_ms(span, children[span["span_id"]])
+        by_kind[span["kind"]] += self_ms
+        by_name[span["name"]] += self_ms
+
+        frames = [span["name"]]
+        parent = by_id.get(span["parent_id"])
+        while parent is not None:
+            frames.append(parent["name"])
+            parent = by_id.get(parent["parent_id"])
+        stacks[";".join(reversed(frames))] += self_ms
+
+    wall_ms = max((span["end_ms"] for span in spans), default=0.0)
+    return {
+        "wall_ms": round(wall_ms, 3),
+        "spans": len(spans),
+        "critical_path": critical_path(spans),
+        "self_time_by_kind": {kind: round(ms, 3) for kind, ms in sorted(by_kind.items(), key=lambda item: -item[1])},
+        "self_time_by_name": {name: round(ms, 3) for name, ms in sorted(by_name.items(), key=lambda item: -item[1])},
+        # One "frame;frame;frame milliseconds" line per stack, as read by flamegraph.pl and speedscope
+        "collapsed_stacks": [f"{stack} {round(ms)}" for stack, ms in sorted(stacks.items()) if ms >= 0.5],
+        "errors": [{"name": span["name"], "error": span["error"]} for span in spans if span["error"]]
+    }
@@ -1,6 +1,6 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import os
@@ -8,15 +8,17 @@ import json
 import uuid
 from datetime import datetime
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 
 from crew_manager import CrewManager
+from helpers import artifacts, profiling, tracing
+from helpers.broker import create_broker
+from helpers.deadline import JobDeadline
+from helpers.job_results import JobResultStore, JobStore
+from helpers.job_runner import run_refresh_job, run_research_job
+from helpers.scheduler import DeadlineScheduler
 
 app = FastAPI(title="RankX Product Research API", version="1.0.0")
 
-# Store for tracking job statuses
-job_store = {}
-executor = ThreadPoolExecutor(max_workers=2)
 
 # Pydantic models for API
 class ProductResearchRequest(BaseModel):
@@ -27,9 +29,15 @@ class ProductResearchRequest(BaseModel):
     language: str = Field(default="English", description="Language for search queries")
     score_th: float = Field(default=0.10, description="Score threshold for filtering results")
     top_recommendations_no: int = Field(default=10, description="Number of top product recommendations")
+    deadline_seconds: Optional[float] = Field(default=None, description="Time budget in seconds; a partial report is returned when it runs out")
+    profile: bool = Field(default=False, description="Save a cProfile of the job as profile.pstats and profile.txt")
+
+class PriceRefreshRequest(BaseModel):
+    source_job_id: str = Field(..., description="Completed job whose products should be re-priced")
 
 class JobStatus(BaseModel):
     job_id: str
+    job_type: str = "research"  # "research", "refresh"
     status: str  # "pending", "running", "completed", "failed"
     progress: str
     created_at: datetime
@@ -45,29 +53,43 @@ class JobResponse(BaseModel):
 # Initialize CrewManager
 crew_manager = CrewManager()
 
-def run_crew_task(job_id: str, inputs: Dict[str, Any]):
+# Full results live on disk; job_store only keeps compact summaries of the most recent finished jobs
+result_store = JobResultStore(crew_manager.output_dir, crew_manager.settings.result_cache_bytes)
+
+# Store for tracking job statuses
+job_store = JobStore(crew_manager.settings.job_store_max_finished)
+
+# With a broker, jobs are queued for worker processes (see worker.py) and any API node can serve
+# their status; otherwise they run earliest-deadline-first on this process's threads
+settings = crew_manager.settings
+broker = create_broker(
+    settings.broker_url, settings.worker_lease_seconds, settings.job_max_attempts, settings.undated_job_wait_seconds
+) if settings.broker_url else None
+scheduler = DeadlineScheduler(
+    max_workers=settings.max_concurrent_jobs, undated_wait_seconds=settings.undated_job_wait_seconds
+) if broker is None else None
+
+def run_crew_task(job_id: str, inputs: Dict[str, Any], deadline: Optional[JobDeadline] = None):
     """Background task to run the crew"""
-    try:
-        job_store[job_id]["status"] = "running"
-        job_store[job_id]["progress"] = "Initializing agents..."
-        
-        # Execute the crew
-        results = crew_manager.execute_crew(inputs)
-        
-        if results["success"]:
-            job_store[job_id]["status"] = "completed"
-            job_store[job_id]["results"] = results
-            job_store[job_id]["completed_at"] = datetime.now()
-            job_store[job_id]["progress"] = "Task completed successfully!"
-        else:
-            job_store[job_id]["status"] = "failed"
-            job_store[job_id]["error"] = results.get("error", "Unknown error")
-            job_store[job_id]["completed_at"] = datetime.now()
-            
-    except Exception as e:
-        job_store[job_id]["status"] = "failed"
-        job_store[job_id]["error"] = str(e)
-        job_store[job_id]["completed_at"] = datetime.now()
+    run_research_job(crew_manager, result_store, job_id, inputs, deadline, job_store[job_id].update)
+
+def run_refresh_task(job_id: str, source_dir: str):
+    """Background task to re-scrape the prices of a previous job"""
+    run_refresh_job(crew_manager, result_store, job_id, source_dir, job_store[job_id].update)
+
+def fail_job(job_id: str):
+    """Scheduler error handler that marks a job failed"""
+    def on_error(error: Exception):
+        job_store[job_id].update({"status": "failed", "error": str(error), "completed_at": datetime.now()})
+    return on_error
+
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Job record from the broker, or from this process's job_store"""
+    if broker is not None:
+        # Broker reads hit SQLite or Redis, so keep them off the event loop
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, broker.get, job_id)
+    return job_store.get(job_id)
 
 @app.get("/", response_class=HTMLResponse)
 async def get_home():
@@ -277,13 +299,250 @@ async def start_research(request: ProductResearchRequest, background_tasks: Back
     # Generate job ID
     job_id = str(uuid.uuid4())
     
+    if broker is not None:
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(
+            None, broker.enqueue, job_id, "research", request.dict(), "Job queued for processing...",
+            request.deadline_seconds
+        )
+        return JobResponse(
+            job_id=job_id,
+            status="pending",
+            message="Research job started successfully"
+        )
+    
     # Initialize job status
     job_store[job_id] = {
         "job_id": job_id,
+        "job_type": "research",
         "status": "pending",
         "progress": "Job queued for processing...",
         "created_at": datetime.now(),
         "completed_at": None,
         "results": None,
         "error": None
-    }
\ No newline at end of file
+    }
+    
+    # The deadline clock starts at submission, so time spent queued counts against it
+    deadline = JobDeadline(request.deadline_seconds) if request.deadline_seconds else None
+    
+    # Run the crew on the scheduler's worker threads so the event loop stays responsive
+    scheduler.submit(
+        run_crew_task, job_id, request.dict(), deadline,
+        deadline_at=deadline.deadline_at if deadline else None,
+        on_error=fail_job(job_id)
+    )
+    
+    return JobResponse(
+        job_id=job_id,
+        status="pending",
+        message="Research job started successfully"
+    )
+
+@app.post("/api/refresh", response_model=JobResponse)
+async def start_price_refresh(request: PriceRefreshRequest):
+    """Start a price refresh that re-scrapes only the products of a previous job"""
+    source = await get_job(request.source_job_id)
+    if source is None:
+        raise HTTPException(status_code=404, detail="Source job not found")
+    if source["status"] != "completed" or not source["results"]:
+        raise HTTPException(status_code=400, detail="Source job has not completed")
+    
+    source_dir = source["results"]["output_directory"]
+    if "step_3_search_results.json" not in source["results"].get("artifacts", {}):
+        raise HTTPException(status_code=400, detail="Source job has no extracted products")
+    
+    job_id = str(uuid.uuid4())
+    if broker is not None:
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(
+            None, broker.enqueue, job_id, "refresh", {"source_dir": source_dir}, "Price refresh queued for processing..."
+        )
+        return JobResponse(
+            job_id=job_id,
+            status="pending",
+            message="Price refresh started successfully"
+        )
+    
+    job_store[job_id] = {
+        "job_id": job_id,
+        "job_type": "refresh",
+        "status": "pending",
+        "progress": "Price refresh queued for processing...",
+        "created_at": datetime.now(),
+        "completed_at": None,
+        "results": None,
+        "error": None
+    }
+    
+    scheduler.submit(run_refresh_task, job_id, source_dir, on_error=fail_job(job_id))
+    
+    return JobResponse(
+        job_id=job_id,
+        status="pending",
+        message="Price refresh started successfully"
+    )
+
+@app.get("/api/job/{job_id}/status", response_model=JobStatus)
+async def get_job_status(job_id: str):
+    """Get the status of a research job"""
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return JobStatus(**job)
+
+@app.get("/api/job/{job_id}/results")
+async def get_job_results(job_id: str):
+    """Get the full results of a completed job, loaded from disk on demand"""
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job["status"] != "completed":
+        raise HTTPException(status_code=400, detail=f"Job is {job['status']}")
+    
+    loop = asyncio.get_event_loop()
+    results = await loop.run_in_executor(None, result_store.load, job_id, job["results"])
+    if results is None:
+        raise HTTPException(status_code=404, detail="Job results are no longer available")
+    
+    return results
+
+async def get_completed_job_summary(job_id: str) -> Dict[str, Any]:
+    """Summary of a completed job, including its artifact index"""
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job["status"] != "completed" or not job["results"]:
+        raise HTTPException(status_code=400, detail=f"Job is {job['status']}")
+    
+    return job["results"]
+
+@app.get("/api/job/{job_id}/files")
+async def list_job_files(job_id: str):
+    """List the output files of a completed job"""
+    summary = await get_completed_job_summary(job_id)
+    return {
+        "job_id": job_id,
+        "files": [
+            {
+                "name": entry["name"],
+                "size": entry["size"],
+                "content_type": entry["content_type"],
+                "url": f"/api/job/{job_id}/download/{entry['name']}"
+            }
+            for entry in summary["artifacts"].values()
+        ]
+    }
+
+@app.get("/api/job/{job_id}/download/{filename}")
+async def download_job_file(job_id: str, filename: str, request: Request):
+    """Stream an output file with ETag, pre-compressed variants and byte-range support"""
+    summary = await get_completed_job_summary(job_id)
+    
+    # Only indexed names are served, which also rules out path traversal
+    entry = summary["artifacts"].get(filename)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    range_header = request.headers.get("range")
+    encoding = None
+    if not range_header:
+        encoding = artifacts.choose_encoding(request.headers.get("accept-encoding", ""), entry["encodings"])
+    
+    etag = f'"{entry["etag"]}-{encoding}"' if encoding else f'"{entry["etag"]}"'
+    disposition = "inline" if entry["content_type"] == "text/html" else "attachment"
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "private, max-age=3600",
+        "Content-Disposition": f'{disposition}; filename="{filename}"'
+    }
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    
+    path = artifacts.variant_path(summary["output_directory"], filename, encoding)
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="File is no longer available")
+    
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(entry["encodings"][encoding])
+        return StreamingResponse(artifacts.iter_file(path), media_type=entry["content_type"], headers=headers)
+    
+    size = entry["size"]
+    try:
+        byte_range = artifacts.parse_range(range_header, size)
+    except ValueError:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+    
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(artifacts.iter_file(path), media_type=entry["content_type"], headers=headers)
+    
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        artifacts.iter_file(path, start, end),
+        status_code=206,
+        media_type=entry["content_type"],
+        headers=headers
+    )
+
+@app.get("/api/job/{job_id}/trace")
+async def get_job_trace(job_id: str):
+    """Critical path and self-time breakdown of a completed job's trace"""
+    summary = await get_completed_job_summary(job_id)
+    if tracing.TRACE_FILENAME not in summary["artifacts"]:
+        raise HTTPException(status_code=404, detail="No trace was recorded for this job")
+    
+    path = os.path.join(summary["output_directory"], tracing.TRACE_FILENAME)
+    loop = asyncio.get_event_loop()
+    spans = await loop.run_in_executor(None, tracing.load_trace, path)
+    return {"job_id": job_id, **tracing.trace_view(spans)}
+
+@app.get("/api/admin/profile", response_class=PlainTextResponse)
+async def profile_process(seconds: float = 10.0, interval_ms: float = 10.0):
+    """Sample every thread of this API process and return collapsed stacks for flamegraph tools"""
+    if not settings.admin_profiling:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not 0 < seconds <= settings.profile_max_seconds:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {settings.profile_max_seconds}")
+    # Written so that NaN fails too; a zero interval would busy-loop and a negative one makes sleep raise
+    if not 1 <= interval_ms <= seconds * 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and the sampling time in ms")
+    
+    loop = asyncio.get_event_loop()
+    counts = await loop.run_in_executor(None, profiling.sample_stacks, seconds, interval_ms / 1000)
+    return PlainTextResponse(profiling.format_collapsed(counts))
+
+@app.get("/api/jobs")
+async def list_jobs():
+    """List all jobs with their current status"""
+    if broker is not None:
+        loop = asyncio.get_event_loop()
+        return {"jobs": await loop.run_in_executor(None, broker.list_jobs)}
+    
+    return {
+        "jobs": [
+            {
+                "job_id": job["job_id"],
+                "job_type": job["job_type"],
+                "status": job["status"],
+                "created_at": job["created_at"],
+                "completed_at": job["completed_at"]
+            }
+            for job in job_store.values()
+        ]
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
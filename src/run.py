@@ -33,6 +33,17 @@ def run_streamlit():
         print(f"❌ Error starting Streamlit: {e}")
         sys.exit(1)
 
+def run_worker():
+    """Run a worker process for queued jobs"""
+    try:
+        from worker import main as worker_main
+        print("🚀 Starting worker...")
+        sys.argv = [sys.argv[0]]
+        worker_main()
+    except Exception as e:
+        print(f"❌ Error starting worker: {e}")
+        sys.exit(1)
+
 def check_environment():
     """Check if environment is properly configured"""
     print("🔍 Checking environment...")
@@ -73,8 +84,8 @@ def main():
     parser = argparse.ArgumentParser(description="RankX Product Research System Runner")
     parser.add_argument(
         "interface",
-        choices=["fastapi", "streamlit", "api", "web"],
-        help="Choose interface to run (fastapi/api for REST API, streamlit/web for web interface)"
+        choices=["fastapi", "streamlit", "api", "web", "worker"],
+        help="Choose interface to run (fastapi/api for REST API, streamlit/web for web interface, worker for a job worker)"
     )
     parser.add_argument(
         "--check-env",
@@ -119,6 +130,8 @@ def main():
         run_fastapi()
     elif args.interface in ["streamlit", "web"]:
         run_streamlit()
+    elif args.interface == "worker":
+        run_worker()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -2,8 +2,10 @@ import streamlit as st
 import os
 import json
 import time
+import uuid
 from datetime import datetime
 from crew_manager import CrewManager
+from helpers.config import Settings
 import threading
 from concurrent.futures import ThreadPoolExecutor
 
@@ -15,9 +17,61 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Reports larger than this are previewed as source, one chunk at a time
+PREVIEW_CHUNK_BYTES = 512 * 1024
+
+# Downloads up to this size are cached (at most 8, so 16 MB per server); larger files are streamed from disk
+DOWNLOAD_CACHE_MAX_BYTES = 2 * 1024 * 1024
+
+@st.cache_resource(show_spinner=False)
+def get_crew_manager(openai_key: str, agentops_key: str, tavily_key: str, scrapegraph_key: str) -> CrewManager:
+    """One CrewManager per process and set of API keys, shared by all sessions"""
+    # The keys go into the manager's own Settings; os.environ is shared by every session
+    return CrewManager(Settings(
+        openai_api_key=openai_key,
+        agentops_api_key=agentops_key or None,
+        tavily_api_key=tavily_key,
+        scrapegraph_api_key=scrapegraph_key
+    ))
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def list_output_files(output_dir: str, dir_mtime: int) -> list:
+    """(name, size) of the files in an output directory; re-read only when the directory changes"""
+    return sorted(
+        (entry.name, entry.stat().st_size)
+        for entry in os.scandir(output_dir) if entry.is_file()
+    )
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def read_file_bytes(file_path: str, file_mtime: int) -> bytes:
+    """Contents of a small file, cached until the file changes"""
+    with open(file_path, "rb") as f:
+        return f.read()
+
+def download_file_button(file_path: str, file_name: str):
+    """Download button that only caches small files; large ones are handed to Streamlit as a file handle"""
+    file_stat = os.stat(file_path)
+    if file_stat.st_size <= DOWNLOAD_CACHE_MAX_BYTES:
+        st.download_button(
+            label=f"⬇️ Download {file_name}",
+            data=read_file_bytes(file_path, file_stat.st_mtime_ns),
+            file_name=file_name,
+            key=f"download_{file_name}"
+        )
+        return
+    with open(file_path, "rb") as f:
+        st.download_button(label=f"⬇️ Download {file_name}", data=f, file_name=file_name, key=f"download_{file_name}")
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def read_file_chunk(file_path: str, file_mtime: int, index: int, chunk_size: int = PREVIEW_CHUNK_BYTES) -> str:
+    """One chunk of a text file, cached until the file changes"""
+    with open(file_path, "rb") as f:
+        f.seek(index * chunk_size)
+        return f.read(chunk_size).decode("utf-8", errors="replace")
+
 # Initialize session state
 if "crew_manager" not in st.session_state:
-    st.session_state.crew_manager = CrewManager()
+    st.session_state.crew_manager = None
 if "job_status" not in st.session_state:
     st.session_state.job_status = None
 if "job_results" not in st.session_state:
@@ -31,7 +85,8 @@ def run_research_job(inputs):
     st.session_state.job_status = "Starting research..."
     
     try:
-        results = st.session_state.crew_manager.execute_crew(inputs)
+        # Each run writes to its own directory so concurrent sessions don't overwrite each other
+        results = st.session_state.crew_manager.execute_crew(inputs, job_id=str(uuid.uuid4()))
         st.session_state.job_results = results
         st.session_state.job_status = "Research completed successfully!"
     except Exception as e:
@@ -54,16 +109,6 @@ def main():
         agentops_key = st.text_input("AgentOps API Key", type="password", value=os.getenv("AGENTOPS_API_KEY", ""))
         tavily_key = st.text_input("Tavily API Key", type="password", value=os.getenv("TAVILY_API_KEY", ""))
         scrapegraph_key = st.text_input("ScrapGraph API Key", type="password", value=os.getenv("SCRAPEGRAPH_API_KEY", ""))
-        
-        # Update environment variables
-        if openai_key:
-            os.environ["OPENAI_API_KEY"] = openai_key
-        if agentops_key:
-            os.environ["AGENTOPS_API_KEY"] = agentops_key
-        if tavily_key:
-            os.environ["TAVILY_API_KEY"] = tavily_key
-        if scrapegraph_key:
-            os.environ["SCRAPEGRAPH_API_KEY"] = scrapegraph_key
     
     # Main content area
     col1, col2 = st.columns([2, 1])
@@ -148,6 +193,9 @@ def main():
                     "top_recommendations_no": top_recommendations_no
                 }
                 
+                # Shared backend, created once per process for these API keys
+                st.session_state.crew_manager = get_crew_manager(openai_key, agentops_key, tavily_key, scrapegraph_key)
+                
                 # Validate inputs
                 validation = st.session_state.crew_manager.validate_inputs(inputs)
                 if not validation["valid"]:
@@ -188,36 +236,34 @@ def main():
                 
                 # List available files
                 if os.path.exists(output_dir):
-                    files = [f for f in os.listdir(output_dir) if os.path.isfile(os.path.join(output_dir, f))]
+                    files = list_output_files(output_dir, os.stat(output_dir).st_mtime_ns)
                     
                     if files:
                         st.subheader("📄 Generated Files")
-                        for file in files:
-                            file_path = os.path.join(output_dir, file)
-                            file_size = os.path.getsize(file_path)
-                            
-                            col_file, col_download = st.columns([3, 1])
-                            with col_file:
-                                st.write(f"📄 {file} ({file_size} bytes)")
-                            with col_download:
-                                with open(file_path, "rb") as f:
-                                    st.download_button(
-                                        label="⬇️",
-                                        data=f.read(),
-                                        file_name=file,
-                                        key=f"download_{file}"
-                                    )
+                        for file, file_size in files:
+                            st.write(f"📄 {file} ({file_size} bytes)")
+                        
+                        # Only the selected file is read, and only when it changes
+                        selected_file = st.selectbox("Select file to download:", [file for file, _ in files])
+                        if selected_file:
+                            download_file_button(os.path.join(output_dir, selected_file), selected_file)
                         
                         # Special handling for HTML report
-                        html_files = [f for f in files if f.endswith('.html')]
+                        html_files = [file for file, _ in files if file.endswith('.html')]
                         if html_files:
                             st.subheader("📋 Report Preview")
                             selected_html = st.selectbox("Select HTML file to preview:", html_files)
                             if selected_html:
                                 html_path = os.path.join(output_dir, selected_html)
-                                with open(html_path, "r", encoding="utf-8") as f:
-                                    html_content = f.read()
+                                html_stat = os.stat(html_path)
+                                if html_stat.st_size <= PREVIEW_CHUNK_BYTES:
+                                    html_content = read_file_chunk(html_path, html_stat.st_mtime_ns, 0)
                                     st.components.v1.html(html_content, height=600, scrolling=True)
+                                else:
+                                    chunks = -(-html_stat.st_size // PREVIEW_CHUNK_BYTES)
+                                    st.caption(f"Large report ({html_stat.st_size} bytes): showing the source in {chunks} parts.")
+                                    chunk_index = st.number_input("Part", min_value=1, max_value=chunks, value=1) - 1
+                                    st.code(read_file_chunk(html_path, html_stat.st_mtime_ns, chunk_index), language="html")
                 
             else:
                 st.error("❌ Research failed!")
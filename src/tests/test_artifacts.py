@@ -0,0 +1,26 @@
+import pytest
+
+from helpers.artifacts import parse_range
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=10-", (10, 99)),
+    ("bytes=90-200", (90, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("BYTES=5-5", (5, 5)),
+])
+def test_parse_range_satisfiable(header, expected):
+    assert parse_range(header, 100) == expected
+
+@pytest.mark.parametrize("header", [
+    None, "", "bytes=abc", "items=0-1", "bytes=", "bytes=-", "bytes=0-1,5-9", "bytes=9-5", "bytes=1-2-3",
+])
+def test_parse_range_ignores_malformed_and_unsupported_headers(header):
+    assert parse_range(header, 100) is None
+
+@pytest.mark.parametrize("header, size", [("bytes=100-", 100), ("bytes=200-300", 100), ("bytes=-0", 100),
+                                          ("bytes=-5", 0)])
+def test_parse_range_rejects_unsatisfiable_ranges(header, size):
+    with pytest.raises(ValueError):
+        parse_range(header, size)
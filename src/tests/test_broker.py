@@ -0,0 +1,108 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from helpers import broker as broker_module
+from helpers.broker import ABANDONED_MESSAGE, RedisBroker, SQLiteBroker
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(broker_module, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+@pytest.fixture(params=["sqlite", "redis"])
+def make_broker(request, tmp_path):
+    def make(lease_seconds: float = 60.0, max_attempts: int = 3):
+        if request.param == "sqlite":
+            return SQLiteBroker(str(tmp_path / "jobs.db"), lease_seconds, max_attempts)
+        fakeredis = pytest.importorskip("fakeredis")
+        return RedisBroker(client=fakeredis.FakeRedis(decode_responses=True), lease_seconds=lease_seconds,
+                           max_attempts=max_attempts)
+    return make
+
+def test_claims_earliest_deadline_first(make_broker, clock):
+    broker = make_broker()
+    broker.enqueue("undated", "research", {}, "queued")
+    clock.now += 1
+    broker.enqueue("late", "research", {}, "queued", deadline_seconds=300)
+    clock.now += 1
+    broker.enqueue("soon", "research", {}, "queued", deadline_seconds=30)
+
+    claimed = [broker.claim("worker-1")["job_id"] for _ in range(3)]
+    assert claimed == ["soon", "late", "undated"]
+    assert broker.claim("worker-1") is None
+
+def test_heartbeat_extends_the_lease(make_broker, clock):
+    broker = make_broker(lease_seconds=60)
+    broker.enqueue("job", "research", {}, "queued")
+    broker.claim("worker-1")
+
+    clock.now += 50
+    assert broker.heartbeat("job", "worker-1")
+    clock.now += 50
+    assert broker.claim("worker-2") is None
+    assert broker.get("job")["worker_id"] == "worker-1"
+
+def test_expired_lease_is_redelivered(make_broker, clock):
+    broker = make_broker(lease_seconds=60)
+    broker.enqueue("job", "research", {"product_name": "laptop"}, "queued")
+    first = broker.claim("worker-1")
+    assert first["attempts"] == 1
+
+    clock.now += 61
+    second = broker.claim("worker-2")
+    assert second["job_id"] == "job"
+    assert second["worker_id"] == "worker-2"
+    assert second["attempts"] == 2
+    assert second["payload"] == {"product_name": "laptop"}
+
+def test_stale_worker_cannot_write(make_broker, clock):
+    broker = make_broker(lease_seconds=60)
+    broker.enqueue("job", "research", {}, "queued")
+    broker.claim("worker-1")
+    clock.now += 61
+    broker.claim("worker-2")
+
+    assert not broker.heartbeat("job", "worker-1")
+    assert not broker.update("job", {"status": "completed"}, worker_id="worker-1")
+    assert broker.get("job")["status"] == "running"
+    assert broker.update("job", {"progress": "Scraping..."}, worker_id="worker-2")
+    assert broker.get("job")["progress"] == "Scraping..."
+
+def test_job_fails_after_max_attempts(make_broker, clock):
+    broker = make_broker(lease_seconds=60, max_attempts=2)
+    broker.enqueue("job", "research", {}, "queued")
+    broker.claim("worker-1")
+    clock.now += 61
+    broker.claim("worker-2")
+    clock.now += 61
+
+    assert broker.claim("worker-3") is None
+    job = broker.get("job")
+    assert job["status"] == "failed"
+    assert job["error"] == ABANDONED_MESSAGE.format(attempts=2)
+
+def test_results_round_trip(make_broker, clock):
+    broker = make_broker()
+    broker.enqueue("job", "research", {}, "queued")
+    broker.claim("worker-1")
+    summary = {"success": True, "metrics": {"llm_escalations": {"search": 1}}, "result_bytes": 42}
+    completed_at = datetime(2024, 5, 1, 12, 30)
+
+    assert broker.update("job", {"status": "completed", "results": summary, "completed_at": completed_at},
+                         worker_id="worker-1")
+    job = broker.get("job")
+    assert job["status"] == "completed"
+    assert job["results"] == summary
+    assert job["completed_at"] == completed_at.isoformat()
+    assert job["lease_until"] is None
+    assert [entry["job_id"] for entry in broker.list_jobs()] == ["job"]
@@ -0,0 +1,94 @@
+import json
+
+from helpers.context_compaction import MIN_SNIPPET_CHARS, compact_output, trim_text
+from helpers.tracing import count_tokens
+
+MODEL = "gpt-4o"
+
+def search_results(count: int, words: int = 120):
+    return {"results": [
+        {
+            "url": f"https://shop.example/product-{i}",
+            "title": f"Split air conditioner {i}",
+            "score": round(1 - i / 100, 2),
+            "content": " ".join(f"inverter{i} cooling energy class" for _ in range(words // 4)),
+            "raw_content": "<html>" * 50,
+            "search_query": "split air conditioner",
+        }
+        for i in range(count)
+    ]}
+
+def products(ranks):
+    return {"products": [
+        {
+            "product_title": f"Product {position}",
+            "product_url": f"https://shop.example/p/{rank}",
+            "product_image_url": "",
+            "product_current_price": 100.0 + rank,
+            "product_original_price": None,
+            "product_discount_percentage": 5,
+            "product_specs": [{"specification_name": "power", "specification_value": "12000 BTU"}],
+            "agent_recommendation_rank": rank,
+            "agent_recommendation_notes": ["Quiet and efficient " * 30],
+            "page_url": f"https://shop.example/p/{rank}",
+        }
+        for position, rank in enumerate(ranks)
+    ]}
+
+def compact(consumer, data, max_tokens):
+    return compact_output(consumer, data, json.dumps(data), max_tokens, MODEL)
+
+def test_trim_text_cuts_at_a_word_boundary():
+    assert trim_text("  split   air conditioner  ", 100) == "split air conditioner"
+    assert trim_text("split air conditioner", 12) == "split air…"
+
+def test_projection_keeps_only_the_fields_the_next_task_reads():
+    text, stats = compact("report", products([3]), max_tokens=0)
+    product = json.loads(text)["products"][0]
+
+    assert set(product) == {
+        "product_title", "product_url", "product_current_price", "product_discount_percentage",
+        "product_specs", "agent_recommendation_rank", "agent_recommendation_notes",
+    }
+    assert len(product["agent_recommendation_notes"][0]) <= 301
+    assert stats["records_after"] == stats["records_before"] == 1
+    assert stats["tokens_after"] < stats["tokens_before"]
+
+def test_snippets_are_trimmed_before_records_are_dropped():
+    data = search_results(5)
+    untrimmed, _ = compact("scrape", data, max_tokens=0)
+    budget = count_tokens(MODEL, text=untrimmed) * 3 // 4
+    text, stats = compact("scrape", data, budget)
+    results = json.loads(text)["results"]
+
+    assert stats["records_after"] == 5
+    assert MIN_SNIPPET_CHARS <= stats["snippet_chars"] < 300
+    assert stats["tokens_after"] <= budget
+    assert [result["url"] for result in results] == [result["url"] for result in data["results"]]
+
+def test_records_are_dropped_once_snippets_reach_the_minimum():
+    data = search_results(20)
+    budget = 400
+    text, stats = compact("scrape", data, budget)
+    results = json.loads(text)["results"]
+
+    assert stats["snippet_chars"] == MIN_SNIPPET_CHARS
+    assert 1 <= stats["records_after"] < 20
+    assert stats["tokens_after"] == count_tokens(MODEL, text=text) <= budget
+    # The search ranking order is kept and every kept record still names its page
+    assert [result["url"] for result in results] == [result["url"] for result in data["results"][:len(results)]]
+    assert all({"url", "title", "score", "content"} <= set(result) for result in results)
+    assert all(len(result["content"]) <= MIN_SNIPPET_CHARS + 1 for result in results)
+
+def test_lowest_ranked_products_are_dropped_first():
+    data = products([2, 5, 1, 4, 3, 5])
+    _, full = compact("report", data, max_tokens=0)
+    text, stats = compact("report", data, full["tokens_after"] // 2)
+    kept = json.loads(text)["products"]
+
+    assert stats["tokens_after"] <= full["tokens_after"] // 2
+    assert 1 <= len(kept) < 6
+    assert [product["agent_recommendation_rank"] for product in kept] == [5, 5, 4, 3, 2, 1][:len(kept)]
+    # Ties keep the scraping agent's order
+    assert [product["product_title"] for product in kept[:2]] == ["Product 1", "Product 5"]
+    assert all(product["product_url"] and product["product_current_price"] for product in kept)
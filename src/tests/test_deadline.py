@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+from helpers.deadline import DeadlineExceeded, JobCancelled, JobDeadline, cancel_on
+from helpers.llm_router import guard_deadline
+from helpers.scheduler import DeadlineScheduler
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def call(self, messages):
+        self.calls += 1
+        return "ok"
+
+def test_abandoned_crew_stops_at_next_llm_call():
+    llm = FakeLLM()
+    guard_deadline(llm)
+    deadline = JobDeadline(60)
+    with deadline.activate():
+        assert llm.call([]) == "ok"
+        deadline.expire()
+        with pytest.raises(DeadlineExceeded):
+            llm.call([])
+    assert llm.calls == 1
+
+def test_llm_calls_outside_a_deadline_are_not_guarded():
+    llm = FakeLLM()
+    guard_deadline(llm)
+    assert llm.call([]) == "ok"
+
+def test_cancelled_job_stops_at_next_llm_call():
+    llm = FakeLLM()
+    guard_deadline(llm)
+    cancelled = threading.Event()
+    with cancel_on(cancelled):
+        assert llm.call([]) == "ok"
+        cancelled.set()
+        with pytest.raises(JobCancelled):
+            llm.call([])
+    assert llm.calls == 1
+
+def test_scheduler_reports_job_exceptions():
+    scheduler = DeadlineScheduler(max_workers=1)
+    errors = []
+    done = threading.Event()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    def on_error(error):
+        errors.append(error)
+        done.set()
+
+    scheduler.submit(fail, on_error=on_error)
+    assert done.wait(5)
+    scheduler.shutdown()
+    assert str(errors[0]) == "boom"
+
+def test_undated_jobs_are_not_starved_by_later_dated_jobs():
+    scheduler = DeadlineScheduler(max_workers=1, undated_wait_seconds=60)
+    started, order = threading.Event(), []
+    release = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    scheduler.submit(block)
+    assert started.wait(5)
+    now = time.monotonic()
+    scheduler.submit(order.append, "undated")
+    scheduler.submit(order.append, "due soon", deadline_at=now + 10)
+    scheduler.submit(order.append, "due later", deadline_at=now + 3600)
+    release.set()
+    scheduler.shutdown()
+    assert order == ["due soon", "undated", "due later"]
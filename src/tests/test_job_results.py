@@ -0,0 +1,15 @@
+from helpers.job_results import JobStore
+
+def test_job_store_evicts_the_oldest_finished_jobs_only():
+    store = JobStore(max_finished=2)
+    store["running"] = {"status": "running"}
+    for name in ("a", "b", "c"):
+        store[name] = {"status": "completed"}
+    store["d"] = {"status": "pending"}
+
+    assert list(store) == ["running", "b", "c", "d"]
+    assert store.evictions == 1
+
+    store["d"].update({"status": "failed"})
+    store["e"] = {"status": "pending"}
+    assert list(store) == ["running", "c", "d", "e"]
@@ -0,0 +1,25 @@
+from helpers.job_results import JobResultStore
+from helpers.job_runner import run_research_job
+
+class FakeCrewManager:
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+
+    def execute_crew(self, inputs, job_id=None, deadline=None):
+        return {"success": True, "results": {"products": []}, "output_directory": str(self.output_dir / job_id)}
+
+def test_results_are_not_saved_after_losing_the_lease(tmp_path):
+    store = JobResultStore(str(tmp_path))
+    updates = []
+    run_research_job(FakeCrewManager(tmp_path), store, "job-1", {}, None, updates.append, lambda: False)
+
+    assert [update["status"] for update in updates] == ["running"]
+    assert not (tmp_path / "job-1" / "crew_results.json").exists()
+
+def test_results_are_saved_while_the_lease_is_held(tmp_path):
+    store = JobResultStore(str(tmp_path))
+    updates = []
+    run_research_job(FakeCrewManager(tmp_path), store, "job-1", {}, None, updates.append, lambda: True)
+
+    assert updates[-1]["status"] == "completed"
+    assert (tmp_path / "job-1" / "crew_results.json").exists()
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import pytest
+
+from helpers import jsonl_artifacts
+from helpers.job_context import JobContext
+from helpers.jsonl_artifacts import JsonlWriter, _read_appended, iter_jsonl, tail_jsonl
+
+def test_tail_reads_only_appended_bytes_and_waits_for_partial_lines(tmp_path):
+    path = tmp_path / "results.jsonl"
+    with JsonlWriter(str(path)) as writer:
+        writer.write({"n": 1})
+    with open(path, "ab") as f:
+        f.write(b'{"n": ')
+
+    state = {"polls": 0}
+
+    def done():
+        state["polls"] += 1
+        if state["polls"] == 2:
+            with open(path, "ab") as f:
+                f.write(b'2}\n{"n": 3}\n')
+        return state["polls"] >= 3
+
+    assert [record["n"] for record in tail_jsonl(str(path), poll_interval=0, done=done)] == [1, 2, 3]
+
+def test_zstd_offset_stops_before_a_partial_frame(tmp_path):
+    if jsonl_artifacts.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    path = tmp_path / "results.jsonl.zst"
+    with JsonlWriter(str(path)) as writer:
+        writer.write({"n": 1})
+        writer.write({"n": 2})
+    complete = path.stat().st_size
+    frame = jsonl_artifacts.zstandard.ZstdCompressor(level=3).compress(b'{"n": 3}\n')
+    with open(path, "ab") as f:
+        f.write(frame[:4])
+
+    data, offset = _read_appended(Path(path), 0)
+    assert data == b'{"n": 1}\n{"n": 2}\n'
+    assert offset == complete
+
+    with open(path, "ab") as f:
+        f.write(frame[4:])
+    data, offset = _read_appended(Path(path), offset)
+    assert data == b'{"n": 3}\n'
+    assert offset == path.stat().st_size
+
+def test_running_a_job_again_replaces_its_streams(tmp_path):
+    path = str(tmp_path / "step_2_search_results.jsonl")
+    for run in range(2):
+        job = JobContext({}, job_id="job-1", output_dir=str(tmp_path))
+        job.open_stream("search_results", path)
+        job.stream("search_results", {"url": "https://a.example", "run": run})
+        job.stream("search_results", {"url": "https://b.example", "run": run})
+        job.close_streams()
+
+    records = list(iter_jsonl(path))
+    assert [record["url"] for record in records] == ["https://a.example", "https://b.example"]
+    assert {record["run"] for record in records} == {1}
+    assert list(tail_jsonl(path)) == records
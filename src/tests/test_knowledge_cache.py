@@ -0,0 +1,49 @@
+from crewai.knowledge.knowledge import Knowledge
+from crewai.knowledge.source.string_knowledge_source import StringKnowledgeSource
+
+from helpers.knowledge_cache import CachedEmbeddingFunction, create_embedder
+
+def test_crewai_knowledge_uses_cached_embedder(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.setenv("CREWAI_STORAGE_DIR", "knowledge-test")
+
+    config = create_embedder("hashing", "", None, str(tmp_path / "cache"))
+    embedder = config["provider"]
+    assert isinstance(embedder, CachedEmbeddingFunction)
+
+    source = StringKnowledgeSource(content="RankX buys espresso machines from approved vendors only.")
+    knowledge = Knowledge(collection_name="rankx", sources=[source], embedder_config=config)
+
+    # The storage embeds with our function instead of failing back to no knowledge
+    assert knowledge.storage.embedder_config is embedder
+    assert embedder.misses > 0
+    assert knowledge.query(["espresso machine vendors"], limit=1)
+
+    # A second crew with the same documents only reads embeddings from the cache
+    misses = embedder.misses
+    Knowledge(collection_name="rankx-again", sources=[StringKnowledgeSource(content=source.content)],
+              embedder_config=config)
+    assert embedder.misses == misses
+    assert embedder.hits > 0
+
+def test_recorded_embedder_replays_without_calling_the_provider(tmp_path):
+    from helpers.cassette import Cassette, install
+    from helpers.knowledge_cache import RecordedEmbeddingFunction
+
+    config = create_embedder("hashing", "", None, str(tmp_path / "cache"), recordable=True)
+    embedder = config["provider"]
+    assert isinstance(embedder, RecordedEmbeddingFunction)
+    install(embedder, "embed", "embeddings:hashing")
+
+    path = tmp_path / "job.jsonl.gz"
+    chunks = ["RankX buys espresso machines.", "Approved vendors only."]
+    with Cassette(str(path), "record", latency="zero").activate():
+        recorded = [list(vector) for vector in embedder(chunks)]
+
+    def offline(input):
+        raise AssertionError("replay reached the embedding provider")
+
+    embedder.inner = offline
+    with Cassette(str(path), "replay", latency="zero").activate() as active:
+        assert [list(vector) for vector in embedder(chunks)] == recorded
+    assert active.stats["replayed"] == 1
@@ -0,0 +1,21 @@
+from types import SimpleNamespace
+
+from helpers.config import Settings
+from helpers.job_context import JobContext
+from helpers.llm_router import LLMRouter
+
+def test_escalations_are_counted_per_job():
+    router = LLMRouter(Settings(openai_api_key="test", tavily_api_key="test", scrapegraph_api_key="test"))
+    routed = SimpleNamespace(model="gpt-4o-mini")
+
+    first, second = JobContext({}, job_id="first"), JobContext({}, job_id="second")
+    with first.activate():
+        router.escalate("search", routed)
+        router.escalate("search", routed)
+    with second.activate():
+        router.escalate("report", routed)
+        router.escalate("report", router.fallback_llm())
+
+    assert first.metrics["llm_escalations"] == {"search": 2}
+    assert second.metrics["llm_escalations"] == {"report": 1}
+    assert router.escalations["search"] == 2 and router.escalations["report"] == 1
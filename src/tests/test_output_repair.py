@@ -0,0 +1,43 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from helpers.output_repair import parse_lenient, repair_output
+
+class Queries(BaseModel):
+    queries: List[str]
+
+class Product(BaseModel):
+    a: int
+    b: Optional[int] = None
+
+class Products(BaseModel):
+    products: List[Product]
+
+def test_truncated_array_keeps_complete_last_element():
+    assert parse_lenient('{"queries": ["x", "y", "z"') == {"queries": ["x", "y", "z"]}
+
+def test_truncated_string_element_is_dropped():
+    assert parse_lenient('{"queries": ["x", "y", "z') == {"queries": ["x", "y"]}
+
+def test_partial_trailing_record_is_dropped_whole():
+    text = '{"products": [{"a":1,"b":2},{"a":3,"b":4},{"a":5,"b'
+    assert parse_lenient(text) == {"products": [{"a": 1, "b": 2}, {"a": 3, "b": 4}]}
+
+    repaired = repair_output(text, Products)
+    assert [product.model_dump() for product in repaired.products] == [{"a": 1, "b": 2}, {"a": 3, "b": 4}]
+
+def test_record_cut_in_a_nested_list_is_dropped_whole():
+    text = '{"products": [{"a":1,"specs":["x"]},{"a":2,"specs":["x", "y'
+    assert parse_lenient(text) == {"products": [{"a": 1, "specs": ["x"]}]}
+
+def test_dangling_separators_and_partial_scalars_are_dropped():
+    assert parse_lenient('{"a": 1, "b":') == {"a": 1}
+    assert parse_lenient('{"a": 1, "b": 12') == {"a": 1}
+    assert parse_lenient('["x", "y",') == ["x", "y"]
+
+def test_trailing_prose_after_complete_json_is_ignored():
+    assert parse_lenient('Here you go: {"queries": ["x"]} Let me know [if] you need more.') == {"queries": ["x"]}
+
+def test_repair_fills_truncated_queries():
+    assert repair_output('```json\n{"queries": ["x", "y", "z"', Queries).queries == ["x", "y", "z"]
@@ -0,0 +1,100 @@
+from datetime import datetime
+
+import pytest
+
+from helpers.price_refresh import (
+    SECTION_START, diff_prices, format_like, parse_price, render_price_section, update_report
+)
+
+@pytest.mark.parametrize("value, expected", [
+    (1299, 1299.0),
+    (12.5, 12.5),
+    ("$1,299.99", 1299.99),
+    ("1 299,00 MAD", 1299.0),
+    ("1.299 €", 1299.0),
+    ("1,299", 1299.0),
+    ("Price: 49.9", 49.9),
+    ("15%", 15.0),
+    ("N/A", None),
+    (None, None),
+    (True, None),
+])
+def test_parse_price(value, expected):
+    assert parse_price(value) == expected
+
+@pytest.mark.parametrize("token, value, expected", [
+    ("1,299.00", 1199, "1,199.00"),
+    ("1 299,00", 1199.5, "1 199,50"),
+    ("1.299", 1199, "1.199"),
+    ("1299", 999.99, "999.99"),
+    ("15", 20, "20"),
+])
+def test_format_like_keeps_the_report_number_format(token, value, expected):
+    assert format_like(token, value) == expected
+
+REPORT = """<html><body>
+<h1>Procurement Report: Laptop 15</h1>
+<p>The <strong>Acme Laptop 15</strong> is the best value at 1,299.00 MAD, 10% below its 1,443.00 MAD list price.</p>
+<table class="table">
+<tr><th>Product</th><th>Price</th><th>Original</th><th>Discount</th></tr>
+<tr><td><a href="https://shop.example/acme">Acme Laptop 15</a></td><td>1,299.00 MAD</td><td>1,443.00 MAD</td><td>10%</td></tr>
+<tr><td><a href="https://shop.example/zeta">Zeta Book</a></td><td>999.00 MAD</td><td>999.00 MAD</td><td>0%</td></tr>
+<tr><td><a href="https://shop.example/other">Other Laptop</a></td><td>1,299.00 MAD</td><td>1,443.00 MAD</td><td>10%</td></tr>
+</table>
+<div class="card"><div class="card-body"><h5>Zeta Book</h5><p>Now 999.00 MAD (was 999.00 MAD)</p></div></div>
+</body></html>
+"""
+
+def refresh(tmp_path, html, products, scraped):
+    path = tmp_path / "step_4_procurement_report.html"
+    path.write_text(html, encoding="utf-8")
+    changes = diff_prices(products, scraped)
+    section = render_price_section(changes, 0, datetime(2024, 5, 1, 9, 0))
+    rewritten = update_report(str(path), section, changes, products)
+    return path.read_text(encoding="utf-8"), rewritten
+
+def test_update_report_rerenders_the_changed_products_only(tmp_path):
+    products = [
+        {"product_title": "Acme Laptop 15", "product_url": "https://shop.example/acme",
+         "product_current_price": "1,299.00 MAD", "product_original_price": "1,443.00 MAD",
+         "product_discount_percentage": 10},
+        {"product_title": "Zeta Book", "product_url": "https://shop.example/zeta",
+         "product_current_price": "999.00 MAD", "product_original_price": "999.00 MAD",
+         "product_discount_percentage": 0},
+        {"product_title": "Other Laptop", "product_url": "https://shop.example/other",
+         "product_current_price": "1,299.00 MAD", "product_original_price": "1,443.00 MAD",
+         "product_discount_percentage": 10},
+    ]
+    scraped = [
+        {"url": "https://shop.example/acme", "product_current_price": 1199.0, "product_original_price": 1443.0,
+         "product_discount_percentage": 17.0},
+        {"url": "https://shop.example/zeta", "product_current_price": 899.0, "product_original_price": 999.0,
+         "product_discount_percentage": 0.0},
+        {"url": "https://shop.example/other", "product_current_price": 1299.0, "product_original_price": 1443.0,
+         "product_discount_percentage": 10.0},
+    ]
+    html, rewritten = refresh(tmp_path, REPORT, products, scraped)
+
+    assert "<strong>Acme Laptop 15</strong> is the best value at 1,199.00 MAD, 17% below its 1,443.00 MAD" in html
+    assert ('<a href="https://shop.example/acme">Acme Laptop 15</a></td><td>1,199.00 MAD</td>'
+            '<td>1,443.00 MAD</td><td>17%</td>') in html
+    # Current and original prices were equal; only the current one, listed first, changed
+    assert "Zeta Book</a></td><td>899.00 MAD</td><td>999.00 MAD</td>" in html
+    assert "<p>Now 899.00 MAD (was 999.00 MAD)</p>" in html
+    # Another product with the same old price and numbers in titles are left alone
+    assert "Other Laptop</a></td><td>1,299.00 MAD</td><td>1,443.00 MAD</td><td>10%</td>" in html
+    assert "<h1>Procurement Report: Laptop 15</h1>" in html
+    assert rewritten == 6
+    assert html.count(SECTION_START) == 1 and html.index(SECTION_START) < html.index("</body>")
+
+def test_update_report_replaces_the_previous_price_section(tmp_path):
+    products = [{"product_title": "Zeta Book", "product_url": "https://shop.example/zeta",
+                 "product_current_price": 999.0, "product_original_price": 999.0, "product_discount_percentage": 0}]
+    scraped = [{"url": "https://shop.example/zeta", "product_current_price": 949.0, "product_original_price": 999.0,
+                "product_discount_percentage": 0.0}]
+    html, _ = refresh(tmp_path, REPORT, products, scraped)
+    html, rewritten = refresh(tmp_path, html, products, [{**scraped[0], "product_current_price": 929.0}])
+
+    assert html.count(SECTION_START) == 1
+    assert "<p>Now 929.00 MAD (was 999.00 MAD)</p>" in html
+    assert rewritten == 2
@@ -0,0 +1,21 @@
+import threading
+
+import pytest
+
+from helpers.profiling import format_collapsed, sample_stacks
+
+@pytest.mark.parametrize("interval", [0, -0.01, float("nan")])
+def test_sample_stacks_rejects_non_positive_intervals(interval):
+    with pytest.raises(ValueError):
+        sample_stacks(0.01, interval)
+
+def test_sample_stacks_counts_other_threads():
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait, name="sleeper", daemon=True)
+    thread.start()
+    try:
+        counts = sample_stacks(0.05, 0.01)
+    finally:
+        stop.set()
+    assert any(stack.startswith("sleeper;") for stack in counts)
+    assert format_collapsed(counts).endswith("\n")
@@ -0,0 +1,50 @@
+from helpers.query_planner import QueryPlan, SearchCoverage, dedupe_queries, expand_queries, split_site
+
+def test_dedupe_drops_reworded_queries():
+    kept, dropped = dedupe_queries([
+        "gaming laptop rtx 4070",
+        "buy gaming laptop rtx 4070 online",
+        "rtx 4070 gaming laptop price",
+        "ultrabook 14 inch oled",
+        "  ",
+    ])
+    assert kept == ["gaming laptop rtx 4070", "ultrabook 14 inch oled"]
+    assert dropped == ["buy gaming laptop rtx 4070 online", "rtx 4070 gaming laptop price"]
+
+def test_dedupe_keeps_queries_below_the_threshold():
+    kept, dropped = dedupe_queries(["laptop 16gb ram", "laptop 32gb ram"], threshold=0.9)
+    assert kept == ["laptop 16gb ram", "laptop 32gb ram"]
+    assert dropped == []
+
+def test_expand_rotates_domains_so_a_capped_plan_covers_every_query():
+    queries = expand_queries(["a", "b"], ["https://www.shop.example/", "store.example", "shop.example"])
+    assert queries == ["a site:shop.example", "b site:store.example", "a site:store.example", "b site:shop.example"]
+    assert expand_queries(["a", "b"], ["shop.example", "store.example"], max_queries=2) == [
+        "a site:shop.example", "b site:store.example"
+    ]
+    assert expand_queries(["a", "b"], []) == ["a", "b"]
+    assert split_site("b site:Store.example") == ("b", "store.example")
+
+def test_searches_saved_baseline_is_one_search_per_generated_query():
+    plan = QueryPlan(["laptop deals", "cheap laptop deals", "tablet"], ["a.example", "b.example"], max_queries=10)
+    assert plan.kept == ["laptop deals", "tablet"]
+    assert len(plan.queries) == 4
+    assert plan.stats() == {"generated": 3, "duplicates": 1, "planned": 4, "baseline_searches": 3}
+
+def test_coverage_stops_after_patience_searches_without_new_pages():
+    coverage = SearchCoverage(patience=2)
+    page = {"results": [{"url": "https://www.shop.example/laptop/"}]}
+
+    assert coverage.observe(page) == 1
+    assert coverage.observe({"results": [{"url": "http://shop.example/laptop?utm=x"}]}) == 0
+    assert not coverage.should_stop()
+    assert coverage.observe(page) == 0
+    assert coverage.should_stop()
+    assert coverage.should_stop()
+    assert coverage.stats() == {"searches": 3, "unique_urls": 1, "skipped": 2}
+
+def test_coverage_never_stops_without_patience():
+    coverage = SearchCoverage(patience=0)
+    for _ in range(5):
+        coverage.observe({"results": []})
+    assert not coverage.should_stop()
@@ -0,0 +1,55 @@
+import pytest
+
+from helpers.reranker import BM25Index, build_query_terms, canonical_url, rerank_results
+
+def result(url, title="", content="", score=0.5):
+    return {"url": url, "title": title, "content": content, "score": score}
+
+def test_canonical_url_ignores_scheme_www_query_and_trailing_slash():
+    assert canonical_url("https://www.Shop.example/ac/split/?utm_source=x#reviews") == "shop.example/ac/split"
+    assert canonical_url("http://shop.example/ac/split") == "shop.example/ac/split"
+
+def test_bm25_prefers_matching_and_rarer_terms():
+    index = BM25Index([
+        "inverter air conditioner 12000 btu",
+        "air purifier with filter",
+        "air fryer deals",
+    ])
+    scores = index.scores(build_query_terms("inverter air conditioner"))
+    assert scores[0] > scores[1] > 0
+    assert scores[1] == pytest.approx(scores[2], rel=0.2)
+    # "air" is in every document, so it weighs less than "inverter"
+    assert index.idf["air"] < index.idf["inverter"]
+    assert BM25Index([]).scores({"air": 1.0}) == []
+
+def test_product_name_terms_weigh_more_than_spec_terms():
+    terms = build_query_terms("Split AC", ["split 12000 btu"])
+    assert terms == {"split": 1.25, "ac": 1.0, "12000": 0.25, "btu": 0.25}
+
+def test_rerank_keeps_the_best_copy_of_each_page():
+    ranked = rerank_results([
+        result("https://www.shop.example/ac-1?ref=a", "Split AC", score=0.2),
+        result("http://shop.example/ac-1/", "Split AC", score=0.9),
+        result("https://other.example/ac-2", "Split AC"),
+    ], "split ac")
+    assert [item["url"] for item in ranked].count("http://shop.example/ac-1/") == 1
+    assert len(ranked) == 2
+
+def test_rerank_filters_by_score_threshold_and_cuts_at_top_k():
+    results = [result(f"https://shop.example/{i}", "split ac", score=i / 10) for i in range(10)]
+    ranked = rerank_results(results, "split ac", score_th=0.5, top_k=3)
+    assert [item["url"] for item in ranked] == [f"https://shop.example/{i}" for i in (9, 8, 7)]
+    assert rerank_results(results, "split ac", score_th=2.0) == []
+    assert rerank_results([], "split ac") == []
+
+def test_rerank_orders_by_relevance_and_target_domain():
+    ranked = rerank_results([
+        result("https://blog.example/news", "Summer news", "air conditioners are mentioned once", score=0.9),
+        result("https://other.example/split-ac", "Daikin split air conditioner", score=0.5),
+        result("https://www.shop.example/split-ac", "Daikin split air conditioner", score=0.5),
+    ], "split air conditioner", target_domains=["shop.example"])
+
+    assert [item["url"] for item in ranked] == [
+        "https://www.shop.example/split-ac", "https://other.example/split-ac", "https://blog.example/news"
+    ]
+    assert ranked[0]["rerank_score"] > ranked[1]["rerank_score"] > ranked[2]["rerank_score"]
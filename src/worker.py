@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Worker process for RankX Product Research jobs.
+
+Claims jobs queued by the API through the broker in BROKER_URL, keeps their lease alive while they
+run and writes status and results back to the broker. Start any number of workers, on one host or
+many (they need to share OUTPUT_DIR with the API nodes so reports can be downloaded):
+
+    python worker.py --concurrency 2
+
+With ADMIN_PROFILING=true, `kill -USR1 <pid>` samples every thread of a live worker and writes the
+collapsed stacks to OUTPUT_DIR/.profiles.
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from crew_manager import CrewManager
+from helpers.broker import JobBroker, create_broker
+from helpers.deadline import JobDeadline, cancel_on
+from helpers.job_results import JobResultStore
+from helpers.job_runner import run_refresh_job, run_research_job
+from helpers.profiling import format_collapsed, sample_stacks
+
+logger = logging.getLogger("worker")
+
+def job_deadline(job: Dict[str, Any]) -> Optional[JobDeadline]:
+    """Rebuild a job's deadline so time spent queued still counts against it"""
+    seconds = job["payload"].get("deadline_seconds")
+    if not seconds:
+        return None
+    queued_for = max(0.0, time.time() - job["submitted_at"])
+    return JobDeadline(seconds, started_at=time.monotonic() - queued_for)
+
+class Worker:
+    """Claim jobs from a broker and run them, renewing each job's lease while it runs"""
+
+    def __init__(self, broker: JobBroker, crew_manager: CrewManager, result_store: JobResultStore,
+                 worker_id: Optional[str] = None, concurrency: int = 1,
+                 heartbeat_seconds: float = 15.0, poll_seconds: float = 1.0):
+        self.broker = broker
+        self.crew_manager = crew_manager
+        self.result_store = result_store
+        self.worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.concurrency = concurrency
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _keep_alive(self, job_id: str, done: threading.Event, lost: threading.Event):
+        while not done.wait(self.heartbeat_seconds):
+            if not self.broker.heartbeat(job_id, self.worker_id):
+                # The crew raises JobCancelled at its next LLM or tool call
+                lost.set()
+                logger.warning("Lost the lease; cancelling the job", extra={"job_id": job_id})
+                return
+
+    def run_job(self, job: Dict[str, Any]):
+        job_id = job["job_id"]
+        done, lost = threading.Event(), threading.Event()
+        threading.Thread(target=self._keep_alive, args=(job_id, done, lost), daemon=True).start()
+
+        # Writes are rejected once another worker has taken the job over
+        update = lambda fields: self.broker.update(job_id, fields, worker_id=self.worker_id)
+        # Renewing the lease right before saving keeps it for as long as the results take to write
+        owns_job = lambda: not lost.is_set() and self.broker.heartbeat(job_id, self.worker_id)
+
+        logger.info("Running job", extra={"job_id": job_id, "job_type": job["job_type"], "attempt": job["attempts"]})
+        try:
+            with cancel_on(lost):
+                if job["job_type"] == "refresh":
+                    run_refresh_job(self.crew_manager, self.result_store, job_id, job["payload"]["source_dir"],
+                                    update, owns_job)
+                else:
+                    run_research_job(self.crew_manager, self.result_store, job_id, job["payload"], job_deadline(job),
+                                     update, owns_job)
+        finally:
+            done.set()
+        logger.info("Finished job", extra={"job_id": job_id})
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                job = self.broker.claim(self.worker_id)
+            except Exception:
+                logger.exception("Error claiming a job")
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_seconds)
+                continue
+            self.run_job(job)
+
+    def start(self):
+        for i in range(self.concurrency):
+            thread = threading.Thread(target=self._loop, name=f"{self.worker_id}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop claiming new jobs"""
+        self._stop.set()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+def write_thread_profile(path: str, seconds: float):
+    """Sample all threads of this worker and write their collapsed stacks to `path`"""
+    counts = sample_stacks(seconds)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(format_collapsed(counts))
+    logger.info("Wrote thread profile", extra={"path": path, "samples": sum(counts.values())})
+
+def install_profile_signal(worker: Worker, output_dir: str, seconds: float):
+    """Sample the worker's threads for `seconds` whenever it receives SIGUSR1"""
+    def handler(signum, frame):
+        path = os.path.join(output_dir, ".profiles", f"{worker.worker_id}-{time.strftime('%Y%m%d-%H%M%S')}.txt")
+        # Sample from another thread so the main thread keeps waiting on the job threads
+        threading.Thread(target=write_thread_profile, args=(path, seconds), daemon=True).start()
+    signal.signal(signal.SIGUSR1, handler)
+
+def main():
+    parser = argparse.ArgumentParser(description="RankX Product Research worker")
+    parser.add_argument("--concurrency", type=int, default=None, help="Jobs run in parallel (default: MAX_CONCURRENT_JOBS)")
+    parser.add_argument("--worker-id", default=None, help="Name used for leases (default: hostname and a random suffix)")
+    parser.add_argument("--profile-seconds", type=float, default=10.0, help="Sampling time of a SIGUSR1 thread profile")
+    args = parser.parse_args()
+
+    crew_manager = CrewManager()
+    settings = crew_manager.settings
+    if not settings.broker_url:
+        print("❌ BROKER_URL is not set; jobs run inside the API process.")
+        sys.exit(1)
+
+    broker = create_broker(
+        settings.broker_url, settings.worker_lease_seconds, settings.job_max_attempts, settings.undated_job_wait_seconds
+    )
+    worker = Worker(
+        broker,
+        crew_manager,
+        JobResultStore(crew_manager.output_dir, settings.result_cache_bytes),
+        worker_id=args.worker_id,
+        concurrency=args.concurrency or settings.max_concurrent_jobs,
+        heartbeat_seconds=settings.worker_heartbeat_seconds
+    )
+
+    print("🤖 RankX Product Research Worker")
+    print("=" * 50)
+    print(f"👷 {worker.worker_id} running {worker.concurrency} job(s) at a time from {settings.broker_url}")
+    if settings.admin_profiling and hasattr(signal, "SIGUSR1"):
+        install_profile_signal(worker, crew_manager.output_dir, min(args.profile_seconds, settings.profile_max_seconds))
+        print(f"🔬 kill -USR1 {os.getpid()} writes a thread profile to {crew_manager.output_dir}/.profiles")
+    worker.start()
+    try:
+        worker.join()
+    except KeyboardInterrupt:
+        # Jobs still running are redelivered to another worker once their lease expires
+        print("\n🛑 Stopping worker...")
+        worker.stop()
+
+if __name__ == "__main__":
+    main()